@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+
+from flask import Response
+from werkzeug.test import EnvironBuilder
+
+from frontend import API_CHUNK_SIZE, app
+
+# Threads running Flask views (and so generate_character) off the event loop
+GENERATION_WORKERS = int(os.environ.get("DND5_GENERATION_WORKERS", os.cpu_count() or 1))
+# Requests allowed to wait for a free worker before new ones are turned away with a 503
+GENERATION_QUEUE = int(os.environ.get("DND5_GENERATION_QUEUE", GENERATION_WORKERS * 4))
+
+executor = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="generation")
+active_requests = 0
+
+
+def dispatch(method: str, path: str, query_string: str, headers: List[Tuple[str, str]], body: bytes) -> Response:
+    environ = EnvironBuilder(
+        path=path, method=method, query_string=query_string, headers=headers, data=body
+    ).get_environ()
+    with app.request_context(environ):
+        return app.full_dispatch_request()
+
+
+def next_chunk(body: Iterator[bytes]) -> bytes:
+    return b"".join(itertools.islice(body, API_CHUNK_SIZE))
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_unavailable(send) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"text/plain"), (b"retry-after", b"1")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b"Generation pool is saturated, retry shortly"})
+
+
+async def http(scope, receive, send) -> None:
+    global active_requests
+    if active_requests >= GENERATION_WORKERS + GENERATION_QUEUE:
+        await send_unavailable(send)
+        return
+    active_requests += 1
+    loop = asyncio.get_running_loop()
+    try:
+        body = await read_body(receive)
+        headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]]
+        response = await loop.run_in_executor(
+            executor,
+            dispatch,
+            scope["method"],
+            scope["path"],
+            scope["query_string"].decode("latin-1"),
+            headers,
+            body,
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.headers],
+            }
+        )
+        # Streamed bodies (NDJSON batches) are generated a chunk at a time on the pool
+        response_body = response.iter_encoded()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, next_chunk, response_body)
+                if not chunk:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            response.close()
+    finally:
+        active_requests -= 1
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send) -> None:
+    if scope["type"] == "http":
+        await http(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await lifespan(receive, send)
@@ -0,0 +1,262 @@
+import array
+import random
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import attr
+import numpy as np
+
+from catalog import Catalog
+from datamodel import SUBCLASSES, Sheet, get_proficiency_bonus
+from randomize import generate_characters
+
+# Stands in for a missing armor, shield or hp seed
+NO_ID = -1
+# Sheets generated per step; only one chunk of Sheet objects is alive at a time
+BATCH_CHUNK_SIZE = 1024
+# Proficiency bonus by level, indexed with the level column
+PROFICIENCY_BONUS = np.array([get_proficiency_bonus(level) for level in range(21)], dtype=np.int8)
+# Columns that concatenate as they are; rating IDs and offsets have to be remapped
+COPIED_COLUMNS = (
+    "level",
+    "first_name_id",
+    "middle_name_id",
+    "race_id",
+    "class_id",
+    "subclass_id",
+    "armor_id",
+    "weapon_id",
+    "shield_id",
+    "base_stats",
+    "hp",
+    "hp_seed",
+    "caster",
+    "feat_ids",
+    "spell_ids",
+)
+
+
+@attr.frozen(eq=False)
+class SheetBatch:
+    # Catalog the ID columns point into
+    catalog: Catalog
+    ratings: Tuple[str, ...]
+    # One entry per sheet
+    level: np.ndarray
+    rating_id: np.ndarray
+    first_name_id: np.ndarray
+    middle_name_id: np.ndarray
+    race_id: np.ndarray
+    class_id: np.ndarray
+    subclass_id: np.ndarray
+    armor_id: np.ndarray
+    weapon_id: np.ndarray
+    shield_id: np.ndarray
+    # Base ability scores, columns ordered str, dex, con, wis, int, cha
+    base_stats: np.ndarray
+    hp: np.ndarray
+    hp_seed: np.ndarray
+    caster: np.ndarray
+    # Sheet i owns feat_ids[feat_offsets[i]:feat_offsets[i + 1]]
+    feat_offsets: np.ndarray
+    feat_ids: np.ndarray
+    # Sheet i owns spell levels spell_row_offsets[i]:spell_row_offsets[i + 1], and spell level j
+    # owns spell_ids[spell_level_offsets[j]:spell_level_offsets[j + 1]]
+    spell_row_offsets: np.ndarray
+    spell_level_offsets: np.ndarray
+    spell_ids: np.ndarray
+
+    @classmethod
+    def from_sheets(
+        cls,
+        sheets: Iterable[Sheet],
+        catalog: Catalog,
+    ) -> "SheetBatch":
+        first_name_ids = {name: i for i, name in enumerate(catalog.first_names)}
+        middle_name_ids = {name: i for i, name in enumerate(catalog.middle_names)}
+        # Rows of a shared catalog are decoded afresh on every access, so match them by name
+        item_ids = catalog.items_by_name
+        race_ids = catalog.races_by_name
+        class_ids = catalog.classes_by_name
+        spell_ids = catalog.spells_by_name
+        feat_ids = catalog.feats_by_name
+        rating_ids = {}
+
+        columns = {
+            "level": array.array("b"),
+            "rating_id": array.array("h"),
+            "first_name_id": array.array("h"),
+            "middle_name_id": array.array("h"),
+            "race_id": array.array("h"),
+            "class_id": array.array("b"),
+            "subclass_id": array.array("b"),
+            "armor_id": array.array("h"),
+            "weapon_id": array.array("h"),
+            "shield_id": array.array("h"),
+            "base_stats": array.array("b"),
+            "hp": array.array("h"),
+            "hp_seed": array.array("q"),
+            "caster": array.array("B"),
+            "feat_offsets": array.array("I", [0]),
+            "feat_ids": array.array("h"),
+            "spell_row_offsets": array.array("I", [0]),
+            "spell_level_offsets": array.array("I", [0]),
+            "spell_ids": array.array("h"),
+        }
+        for sheet in sheets:
+            # Names are "first middle" and first names may contain spaces, so find the split
+            # whose two halves are both catalog names
+            name_parts = sheet.name.split(" ")
+            for split in range(1, len(name_parts)):
+                first_name = first_name_ids.get(" ".join(name_parts[:split]))
+                middle_name = middle_name_ids.get(" ".join(name_parts[split:]))
+                if first_name is not None and middle_name is not None:
+                    break
+            else:
+                raise ValueError(f"{sheet.name!r} is not built from the catalog names")
+            armor, weapon, shield = sheet.items
+
+            columns["level"].append(sheet.level)
+            columns["rating_id"].append(rating_ids.setdefault(sheet.rating, len(rating_ids)))
+            columns["first_name_id"].append(first_name)
+            columns["middle_name_id"].append(middle_name)
+            columns["race_id"].append(race_ids[sheet.race.name])
+            columns["class_id"].append(class_ids[sheet.cl.name])
+            columns["subclass_id"].append(SUBCLASSES[sheet.cl.name].index(sheet.sub_cl))
+            columns["armor_id"].append(NO_ID if armor is None else item_ids[armor.name])
+            columns["weapon_id"].append(item_ids[weapon.name])
+            columns["shield_id"].append(NO_ID if shield is None else item_ids[shield.name])
+            columns["base_stats"].extend(
+                (sheet.base_str, sheet.base_dex, sheet.base_con, sheet.base_wis, sheet.base_int, sheet.base_cha)
+            )
+            columns["hp"].append(sheet.hp)
+            columns["hp_seed"].append(NO_ID if sheet.hp_seed is None else sheet.hp_seed)
+            columns["caster"].append(sheet.spells is not None)
+            columns["feat_ids"].extend(feat_ids[feat.name] for feat in sheet.feats or ())
+            columns["feat_offsets"].append(len(columns["feat_ids"]))
+            for spell_level in sheet.spells or ():
+                columns["spell_ids"].extend(spell_ids[spell.name] for spell in spell_level)
+                columns["spell_level_offsets"].append(len(columns["spell_ids"]))
+            columns["spell_row_offsets"].append(len(columns["spell_level_offsets"]) - 1)
+
+        arrays = {name: np.array(column) for name, column in columns.items()}
+        arrays["base_stats"] = arrays["base_stats"].reshape(-1, 6)
+        arrays["caster"] = arrays["caster"].astype(bool)
+        return cls(catalog, tuple(rating_ids), **arrays)
+
+    def columns(self) -> Dict[str, Any]:
+        # Everything but the catalog, for handing a batch to a process that holds the same catalog
+        return {field.name: getattr(self, field.name) for field in attr.fields(type(self)) if field.name != "catalog"}
+
+    @classmethod
+    def from_columns(cls, catalog: Catalog, columns: Dict[str, Any]) -> "SheetBatch":
+        return cls(catalog, **columns)
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["SheetBatch"]) -> "SheetBatch":
+        # Batches over one catalog joined in order; offset columns are shifted past the batches before them
+        ratings = {}
+        for batch in batches:
+            for rating in batch.ratings:
+                ratings.setdefault(rating, len(ratings))
+        columns = {name: [] for name in batches[0].columns() if name != "ratings"}
+        feat_total = spell_total = spell_level_total = 0
+        for i, batch in enumerate(batches):
+            first = i == 0
+            for name in COPIED_COLUMNS:
+                columns[name].append(getattr(batch, name))
+            rating_ids = np.array([ratings[rating] for rating in batch.ratings], dtype=batch.rating_id.dtype)
+            columns["rating_id"].append(rating_ids[batch.rating_id] if len(rating_ids) else batch.rating_id)
+            columns["feat_offsets"].append(batch.feat_offsets[0 if first else 1 :] + feat_total)
+            columns["spell_level_offsets"].append(batch.spell_level_offsets[0 if first else 1 :] + spell_total)
+            columns["spell_row_offsets"].append(batch.spell_row_offsets[0 if first else 1 :] + spell_level_total)
+            feat_total += len(batch.feat_ids)
+            spell_total += len(batch.spell_ids)
+            spell_level_total += len(batch.spell_level_offsets) - 1
+        arrays = {name: np.concatenate(values) for name, values in columns.items()}
+        return cls(batches[0].catalog, tuple(ratings), **arrays)
+
+    def __len__(self) -> int:
+        return len(self.level)
+
+    def __getitem__(self, i: int) -> Sheet:
+        # Builds a Sheet for one row on demand. IDs are turned into Python ints before indexing the
+        # catalog: shared tables compute record offsets from them, which overflows in int16
+        i = range(len(self))[i]
+        catalog = self.catalog
+        cl = catalog.classes[int(self.class_id[i])]
+        spells = None
+        if self.caster[i]:
+            spells = [
+                [
+                    catalog.spells[spell_id]
+                    for spell_id in self.spell_ids[
+                        self.spell_level_offsets[j] : self.spell_level_offsets[j + 1]
+                    ].tolist()
+                ]
+                for j in range(self.spell_row_offsets[i], self.spell_row_offsets[i + 1])
+            ]
+        armor, weapon, shield = int(self.armor_id[i]), int(self.weapon_id[i]), int(self.shield_id[i])
+        hp_seed = int(self.hp_seed[i])
+        return Sheet(
+            int(self.level[i]),
+            self.ratings[int(self.rating_id[i])],
+            f"{catalog.first_names[int(self.first_name_id[i])]} {catalog.middle_names[int(self.middle_name_id[i])]}",
+            catalog.races[int(self.race_id[i])],
+            cl,
+            SUBCLASSES[cl.name][int(self.subclass_id[i])],
+            spells,
+            (
+                None if armor == NO_ID else catalog.equipment[armor],
+                catalog.equipment[weapon],
+                None if shield == NO_ID else catalog.equipment[shield],
+            ),
+            *self.base_stats[i].tolist(),
+            feats=tuple(
+                catalog.feats[feat_id]
+                for feat_id in self.feat_ids[self.feat_offsets[i] : self.feat_offsets[i + 1]].tolist()
+            ),
+            hp_seed=None if hp_seed == NO_ID else hp_seed,
+        )
+
+    def __iter__(self) -> Iterator[Sheet]:
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def scores(self) -> np.ndarray:
+        race_bonuses = np.array(
+            [(race.str, race.dex, race.con, race.wis, race.int, race.cha) for race in self.catalog.races], dtype=np.int8
+        )
+        return self.base_stats + race_bonuses[self.race_id]
+
+    @property
+    def mods(self) -> np.ndarray:
+        return (self.scores - 10) // 2
+
+    @property
+    def bm(self) -> np.ndarray:
+        return PROFICIENCY_BONUS[self.level]
+
+    @property
+    def passive_perception(self) -> np.ndarray:
+        return 10 + self.mods[:, 3]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(value.nbytes for value in attr.astuple(self, recurse=False) if isinstance(value, np.ndarray))
+
+
+def generate_batch(
+    n: int,
+    level: int,
+    rating: str,
+    catalog: Catalog,
+    alignment: float = 0.0,
+    rng: Optional[random.Random] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> SheetBatch:
+    sheets = (
+        sheet
+        for start in range(0, n, chunk_size)
+        for sheet in generate_characters(min(chunk_size, n - start), level, rating, catalog, alignment, rng)
+    )
+    return SheetBatch.from_sheets(sheets, catalog)
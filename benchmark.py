@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+import bundle
+import datamodel
+from catalog import Catalog
+from datamodel import SUBCLASSES, SpellIndex
+from randomize import (
+    generate_character,
+    generate_characters,
+    generate_random_base_stats,
+    generate_random_equipment,
+    select_spell_by_class,
+    select_subclass_by_normal_distribution_of_alignment,
+)
+
+BENCHMARK_RESULT_DATA_TYPE = Dict[str, float]
+
+
+def measure(func: Callable[[], Any], repeat: int, number: int) -> BENCHMARK_RESULT_DATA_TYPE:
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "calls": repeat * number,
+        "min_us": min(timings) * 1e6,
+        "median_us": statistics.median(timings) * 1e6,
+        "mean_us": statistics.mean(timings) * 1e6,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cold_start(module: str, repeat: int) -> BENCHMARK_RESULT_DATA_TYPE:
+    # A fresh interpreter per run, so nothing is cached in-process
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+        timings.append(time.perf_counter() - start)
+    return {"calls": repeat, "min_us": min(timings) * 1e6, "median_us": statistics.median(timings) * 1e6}
+
+
+def run_benchmarks(
+    class_name: str, level: int, batch_size: int, repeat: int, number: int, seed: int
+) -> Dict[str, BENCHMARK_RESULT_DATA_TYPE]:
+    results = {}
+    bundle_file = bundle.BUNDLE_FILE
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        # Time the bundle against a fresh compile of the current sources, not whatever bundle is (or is
+        # not) on disk, which would silently fall back to the JSON path
+        bundle.BUNDLE_FILE = os.path.join(bundle_dir, "catalog.bundle")
+        try:
+            bundle.compile_bundle(bundle.BUNDLE_FILE)
+            index = bundle.get_bundle().get("index", {})
+            for loader_name, file in bundle.SOURCES:
+                loader = getattr(datamodel, loader_name)
+                results[f"load/{file}/json"] = measure(lambda: loader.__wrapped__(file), repeat, 1)
+                results[f"load/{file}/bundle"] = measure(lambda: loader(file), repeat, 1)
+                results[f"load/{file}/bundle"]["from_bundle"] = bundle.bundle_key(loader.__wrapped__, file) in index
+        finally:
+            bundle.BUNDLE_FILE = bundle_file
+
+    results["catalog"] = measure(Catalog.load, repeat, 1)
+    catalog = Catalog.load()
+    results["spell_index"] = measure(lambda: SpellIndex.from_spells(catalog.spells), repeat, 1)
+    equipment, spell_index = catalog.equipment, catalog.spell_index
+
+    if class_name not in catalog.classes_by_name:
+        raise ValueError(f"Unknown class {class_name!r}, expected one of {list(catalog.classes_by_name)}")
+    cl = catalog.classes[catalog.classes_by_name[class_name]]
+    rng = random.Random(seed)
+    results["stage/subclass"] = measure(
+        lambda: select_subclass_by_normal_distribution_of_alignment(0.0, cl.name, rng=rng), repeat, number
+    )
+    results["stage/stats"] = measure(
+        lambda: generate_random_base_stats(cl.str, cl.dex, cl.con, cl.wis, cl.int, cl.cha, rng), repeat, number
+    )
+    results["stage/equipment"] = measure(
+        lambda: generate_random_equipment(cl.armor_proficiencies, cl.weapon_proficiencies, equipment, rng),
+        repeat,
+        number,
+    )
+    caster = next((sub_cl for sub_cl in SUBCLASSES[cl.name] if sub_cl.caster), None)
+    if caster is not None and any(cl.class_abilities[level]):
+        results["stage/spells"] = measure(
+            lambda: select_spell_by_class(
+                cl.name, caster.spell_school, cl.class_abilities[level], spell_index, rng
+            ),
+            repeat,
+            number,
+        )
+
+    results["generate_character"] = measure(
+        lambda: generate_character(level, "UNDEFINED", catalog, 0.0, rng), repeat, number
+    )
+    batch = measure(
+        lambda: generate_characters(batch_size, level, "UNDEFINED", catalog, 0.0, rng), repeat, 1
+    )
+    batch["per_sheet_us"] = batch["median_us"] / batch_size
+    results[f"generate_characters/{batch_size}"] = batch
+
+    # Imported last so its catalog loading is not counted in the loader benchmarks
+    from frontend import app
+
+    client = app.test_client()
+    seeds = iter(range(seed, sys.maxsize))
+    results["request/index"] = measure(
+        lambda: client.post("/", data={"level": str(level), "alignment": "0", "seed": str(next(seeds))}),
+        repeat,
+        number,
+    )
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    for name, result in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        ratio = result["median_us"] / previous["median_us"]
+        print(f"{name:48} {previous['median_us']:12.1f} -> {result['median_us']:12.1f} us  x{ratio:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark catalog loading and character generation")
+    parser.add_argument("--class", dest="class_name", default="Wizard")
+    parser.add_argument("--level", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="print the change against a previous results file")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "class": args.class_name,
+            "level": args.level,
+            "batch_size": args.batch_size,
+            "repeat": args.repeat,
+            "number": args.number,
+            "seed": args.seed,
+        },
+        "results": run_benchmarks(
+            args.class_name, args.level, args.batch_size, args.repeat, args.number, args.seed
+        ),
+    }
+    results["results"]["cold_start/frontend"] = cold_start("frontend", args.repeat)
+    # ru_maxrss is in kilobytes on Linux
+    results["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf8") as f:
+            compare(results, json.load(f))
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
+
+BUNDLE_MAGIC = b"DND5BNDL"
+BUNDLE_VERSION = 2
+BUNDLE_FILE = os.environ.get("DND5_BUNDLE", "catalog.bundle")
+
+# (loader name in datamodel, source file) pairs compiled by `python bundle.py`
+SOURCES = (
+    ("load_available_races", "races.json"),
+    ("load_available_spells", "spells.json"),
+    ("load_available_classes", "classes.json"),
+    ("load_available_feats", "feats.json"),
+    ("load_names", "first-names.json"),
+    ("load_names", "middle-names.json"),
+    ("load_available_equipment", "equipment.json"),
+)
+
+BUNDLE_KEY_DATA_TYPE = Tuple[str, Tuple[Tuple[str, Any], ...]]
+BUNDLE_ENTRIES_DATA_TYPE = Dict[BUNDLE_KEY_DATA_TYPE, Tuple[str, Any]]
+
+# Bundle header: schema hash plus the source hash, offset and length of each separately pickled entry
+_bundle: Optional[Dict[str, Any]] = None
+# (st_ino, st_mtime_ns) of the file _bundle was read from; offsets are only valid for that file
+_bundle_identity: Optional[Tuple[int, int]] = None
+
+
+def file_hash(file: str) -> str:
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def schema_hash(module_name: str) -> str:
+    # Pickled objects are only valid for the datamodel source they were built from
+    return file_hash(sys.modules[module_name].__file__)
+
+
+def catalog_version() -> str:
+    # Changes whenever any catalog source file does
+    digest = hashlib.sha256()
+    for _, file in SOURCES:
+        digest.update(file_hash(file).encode("ascii"))
+    return digest.hexdigest()
+
+
+def file_identity(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def read_bundle(bundle_file: str) -> Dict[str, Any]:
+    # Reads only the header; entries are unpickled one at a time as loaders ask for them, so the
+    # variants a process never loads (eager or lazy) never take up memory
+    try:
+        with open(bundle_file, "rb") as f:
+            if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                return {}
+            if int.from_bytes(f.read(4), "little") != BUNDLE_VERSION:
+                return {}
+            header = pickle.load(f)
+            header["file"] = bundle_file
+            header["identity"] = file_identity(os.fstat(f.fileno()))
+            header["data_offset"] = f.tell()
+            return header
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return {}
+
+
+def read_bundle_entry(bundle: Dict[str, Any], offset: int, length: int) -> Optional[Any]:
+    try:
+        with open(bundle["file"], "rb") as f:
+            # The bundle may have been replaced since its header was read
+            if file_identity(os.fstat(f.fileno())) != bundle["identity"]:
+                return None
+            f.seek(bundle["data_offset"] + offset)
+            return pickle.loads(f.read(length))
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+
+def write_bundle(bundle_file: str, schema: str, entries: BUNDLE_ENTRIES_DATA_TYPE) -> None:
+    index = {}
+    blobs = []
+    offset = 0
+    for key, (source_hash, value) in entries.items():
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        index[key] = (source_hash, offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+    tmp_file = bundle_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(BUNDLE_VERSION.to_bytes(4, "little"))
+        pickle.dump({"schema": schema, "index": index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_file, bundle_file)
+
+
+def get_bundle() -> Dict[str, Any]:
+    # Re-read the header whenever the file on disk is not the one it came from (recompiled or removed)
+    global _bundle, _bundle_identity
+    try:
+        identity = file_identity(os.stat(BUNDLE_FILE))
+    except OSError:
+        identity = None
+    if _bundle is None or identity != _bundle_identity:
+        _bundle = read_bundle(BUNDLE_FILE)
+        _bundle_identity = identity
+    return _bundle
+
+
+def bundle_key(loader: Callable[..., Any], file: str, **kwargs) -> BUNDLE_KEY_DATA_TYPE:
+    # Key on every bound argument, defaults included, so e.g. lazy and eager loads never collide
+    arguments = inspect.signature(loader).bind(file, **kwargs)
+    arguments.apply_defaults()
+    return loader.__name__, tuple(arguments.arguments.items())
+
+
+def bundled(loader: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(loader)
+    def load(file: str, **kwargs) -> Any:
+        bundle = get_bundle()
+        entry = bundle.get("index", {}).get(bundle_key(loader, file, **kwargs))
+        if (
+            entry is not None
+            and entry[0] == file_hash(file)
+            and bundle["schema"] == schema_hash(loader.__module__)
+        ):
+            value = read_bundle_entry(bundle, entry[1], entry[2])
+            if value is not None:
+                return value
+        return loader(file, **kwargs)
+
+    return load
+
+
+def compile_bundle(bundle_file: str = BUNDLE_FILE) -> None:
+    import datamodel
+
+    entries = {}
+    for loader_name, file in SOURCES:
+        loader = getattr(datamodel, loader_name).__wrapped__
+        variants = [{}]
+        if "lazy" in inspect.signature(loader).parameters:
+            variants = [{"lazy": False}, {"lazy": True}]
+        for kwargs in variants:
+            entries[bundle_key(loader, file, **kwargs)] = (file_hash(file), loader(file, **kwargs))
+    write_bundle(bundle_file, schema_hash("datamodel"), entries)
+
+
+if __name__ == "__main__":
+    compile_bundle(sys.argv[1] if len(sys.argv) > 1 else BUNDLE_FILE)
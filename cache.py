@@ -0,0 +1,174 @@
+import collections
+import hashlib
+import os
+import threading
+import time
+from typing import Hashable, Optional
+
+import metrics
+
+RESPONSE_CACHE = os.environ.get("DND5_RESPONSE_CACHE", "memory")
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("DND5_RESPONSE_CACHE_ENTRIES", 4096))
+RESPONSE_CACHE_BYTES = int(os.environ.get("DND5_RESPONSE_CACHE_BYTES", 64 * 1024 * 1024))
+# Seconds between full scans of a file cache directory; other workers' writes only show up in a scan
+FILE_CACHE_SCAN_INTERVAL = 60.0
+# An eviction scan trims the directory to this fraction of its bounds, so a full cache does not rescan on every write
+FILE_CACHE_EVICT_TO = 0.9
+
+metrics.REGISTRY.describe("dnd5_cache_requests_total", "Response cache lookups by result")
+
+
+class ResponseCache:
+    # Backends store encoded responses keyed by any hashable with a stable repr
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        value = self.lookup(key)
+        if value is None:
+            self.misses += 1
+            metrics.inc("dnd5_cache_requests_total", {"result": "miss"})
+        else:
+            self.hits += 1
+            metrics.inc("dnd5_cache_requests_total", {"result": "hit"})
+        return value
+
+    def lookup(self, key: Hashable) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        raise NotImplementedError
+
+
+class NullCache(ResponseCache):
+    def lookup(self, key: Hashable) -> Optional[bytes]:
+        return None
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        pass
+
+
+class MemoryCache(ResponseCache):
+    def __init__(self, max_entries: int = RESPONSE_CACHE_ENTRIES, max_bytes: int = RESPONSE_CACHE_BYTES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def lookup(self, key: Hashable) -> Optional[bytes]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = value
+            self.size += len(value)
+            # Evict least recently used entries until both bounds hold
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class FileCache(ResponseCache):
+    # One file per entry in a directory shared by every worker process on the host;
+    # reads touch the file so eviction removes the least recently used entries first
+    def __init__(
+        self, directory: str, max_entries: int = RESPONSE_CACHE_ENTRIES, max_bytes: int = RESPONSE_CACHE_BYTES
+    ):
+        super().__init__()
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Approximate totals: this worker's writes since the last scan are added, overwrites and other
+        # workers' writes are only accounted for at the next scan
+        self.count = 0
+        self.size = 0
+        self.last_scan = 0.0
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            self.evict()
+
+    def path(self, key: Hashable) -> str:
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode("utf8")).hexdigest())
+
+    def lookup(self, key: Hashable) -> Optional[bytes]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.count += 1
+            self.size += len(value)
+            if (
+                self.count > self.max_entries
+                or self.size > self.max_bytes
+                or time.monotonic() - self.last_scan > FILE_CACHE_SCAN_INTERVAL
+            ):
+                self.evict()
+
+    def evict(self) -> None:
+        # Scans the directory, removes the least recently used entries beyond the trimmed bounds and
+        # resets the approximate totals
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        entries.sort()
+        count = len(entries)
+        if count > self.max_entries or size > self.max_bytes:
+            max_entries = int(self.max_entries * FILE_CACHE_EVICT_TO)
+            max_bytes = int(self.max_bytes * FILE_CACHE_EVICT_TO)
+            for _, entry_size, path in entries:
+                if count <= max_entries and size <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                count -= 1
+                size -= entry_size
+        self.count = count
+        self.size = size
+        self.last_scan = time.monotonic()
+
+
+def make_cache(spec: str = RESPONSE_CACHE) -> ResponseCache:
+    # "memory", "off", or "file:<directory>"
+    if spec == "memory":
+        return MemoryCache()
+    if spec == "off":
+        return NullCache()
+    if spec.startswith("file:"):
+        return FileCache(spec[len("file:") :])
+    raise ValueError(f"Unknown response cache {spec!r}, expected memory, off or file:<directory>")
@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import attr
+
+import datamodel
+from bundle import SOURCES, catalog_version
+from datamodel import SUBCLASSES, Class, EquipmentCatalog, Feat, Race, Spell, SpellIndex
+from sharedcatalog import open_shared_catalog, shared_catalog_version, table_name
+
+CATALOG_RELOAD = os.environ.get("DND5_CATALOG_RELOAD") == "1"
+# Seconds between checks of the source files for changes
+CATALOG_POLL_INTERVAL = float(os.environ.get("DND5_CATALOG_POLL_INTERVAL", 2.0))
+# Loads retried when a source file changes while it is being read
+CATALOG_LOAD_ATTEMPTS = 3
+
+FILE_STATE_DATA_TYPE = Tuple[Optional[Tuple[int, int]], ...]
+
+logger = logging.getLogger(__name__)
+
+
+def index_by_name(values: Sequence[Any]) -> Dict[str, int]:
+    return {value.name: i for i, value in enumerate(values)}
+
+
+def fold(value: Optional[str]) -> Optional[str]:
+    return None if value is None else value.casefold()
+
+
+def matches(value: Optional[str], wanted: Optional[str]) -> bool:
+    # wanted is already casefolded; None matches anything
+    return wanted is None or (value is not None and value.casefold() == wanted)
+
+
+def race_matches(race: Race, wanted: Optional[str]) -> bool:
+    # "Dwarf" picks any of "Dwarf (Hill)", "Dwarf (Mountain)", ...; a full name picks just that race
+    return matches(race.name, wanted) or matches(race.name.split(" (", 1)[0], wanted)
+
+
+@attr.frozen
+class Constraints:
+    # Fixed choices for generation, None leaves that choice random. Values are matched case-insensitively
+    cl: Optional[str] = attr.field(default=None, converter=fold)
+    race: Optional[str] = attr.field(default=None, converter=fold)
+    race_source: Optional[str] = attr.field(default=None, converter=fold)
+    size: Optional[str] = attr.field(default=None, converter=fold)
+    spell_school: Optional[str] = attr.field(default=None, converter=fold)
+    subclass: Optional[str] = attr.field(default=None, converter=fold)
+
+    def describe(self) -> str:
+        return ", ".join(f"{name}={value!r}" for name, value in attr.asdict(self).items() if value is not None)
+
+
+@attr.frozen(eq=False)
+class Candidates:
+    # What generation may pick from under one set of constraints
+    classes: Tuple[Class, ...]
+    # Positions in Catalog.races
+    races: Sequence[int]
+    # class name -> names of the allowed subclasses, for classes where only some are allowed
+    subclass_names: Dict[str, Tuple[str, ...]]
+
+
+@attr.frozen(eq=False)
+class Catalog:
+    # Tuples, or for a shared catalog the mapped tables themselves, so rows are decoded when they are
+    # drawn and never copied into every worker. Classes are few and read on every sheet, so they are
+    # always decoded once
+    first_names: Sequence[str]
+    middle_names: Sequence[str]
+    equipment: EquipmentCatalog
+    races: Sequence[Race]
+    classes: Tuple[Class, ...]
+    spells: Sequence[Spell]
+    feats: Sequence[Feat]
+    # Changes whenever any source does; keys caches of generated output
+    version: str
+    spell_index: SpellIndex = attr.field(init=False, repr=False)
+    # name -> position in the table
+    races_by_name: Dict[str, int] = attr.field(init=False, repr=False)
+    classes_by_name: Dict[str, int] = attr.field(init=False, repr=False)
+    spells_by_name: Dict[str, int] = attr.field(init=False, repr=False)
+    feats_by_name: Dict[str, int] = attr.field(init=False, repr=False)
+    items_by_name: Dict[str, int] = attr.field(init=False, repr=False)
+    # Constraints -> Candidates, filled on first use of each combination
+    candidate_sets: Dict[Constraints, Candidates] = attr.field(init=False, repr=False, factory=dict)
+
+    def __attrs_post_init__(self):
+        object.__setattr__(self, "spell_index", SpellIndex.from_spells(self.spells))
+        object.__setattr__(self, "races_by_name", index_by_name(self.races))
+        object.__setattr__(self, "classes_by_name", index_by_name(self.classes))
+        object.__setattr__(self, "spells_by_name", index_by_name(self.spells))
+        object.__setattr__(self, "feats_by_name", index_by_name(self.feats))
+        object.__setattr__(self, "items_by_name", index_by_name(self.equipment))
+
+    def candidates(self, constraints: Constraints) -> Candidates:
+        candidates = self.candidate_sets.get(constraints)
+        if candidates is None:
+            candidates = self.candidate_sets.setdefault(constraints, self.resolve_candidates(constraints))
+        return candidates
+
+    def resolve_candidates(self, constraints: Constraints) -> Candidates:
+        if constraints.race is None and constraints.race_source is None and constraints.size is None:
+            races = range(len(self.races))
+        else:
+            races = tuple(
+                i
+                for i, race in enumerate(self.races)
+                if race_matches(race, constraints.race)
+                and matches(race.source, constraints.race_source)
+                and matches(race.size, constraints.size)
+            )
+        if not races:
+            raise ValueError(f"No race matches {constraints.describe()}")
+        classes = []
+        subclass_names = {}
+        for cl in self.classes:
+            if not matches(cl.name, constraints.cl):
+                continue
+            if constraints.subclass is None and constraints.spell_school is None:
+                classes.append(cl)
+                continue
+            allowed = tuple(
+                subclass.name
+                for subclass in SUBCLASSES[cl.name]
+                if matches(subclass.name, constraints.subclass)
+                and (
+                    constraints.spell_school is None
+                    or (subclass.caster and matches(subclass.spell_school, constraints.spell_school))
+                )
+            )
+            if allowed:
+                classes.append(cl)
+                subclass_names[cl.name] = allowed
+        if not classes:
+            raise ValueError(f"No class matches {constraints.describe()}")
+        return Candidates(tuple(classes), races, subclass_names)
+
+    @classmethod
+    def from_sources(cls, sources: Dict[str, Any], version: str) -> "Catalog":
+        # sources maps table names ("races", "first-names", ...) to the loaded values
+        equipment = sources["equipment"]
+        return cls(
+            sources["first-names"],
+            sources["middle-names"],
+            equipment if isinstance(equipment, EquipmentCatalog) else EquipmentCatalog(equipment),
+            sources["races"],
+            tuple(sources["classes"]),
+            sources["spells"],
+            sources["feats"],
+            version,
+        )
+
+    @classmethod
+    def load(cls) -> "Catalog":
+        # The version is hashed from the files before and after loading; a file saved in between would
+        # otherwise give old content the new version, and the next reload would see nothing to swap
+        for _ in range(CATALOG_LOAD_ATTEMPTS):
+            version = catalog_version()
+            # Every source is read (or taken from the bundle) on its own thread
+            with ThreadPoolExecutor(max_workers=len(SOURCES)) as executor:
+                futures = {
+                    table_name(file): executor.submit(getattr(datamodel, loader_name), file)
+                    for loader_name, file in SOURCES
+                }
+                sources = {name: future.result() for name, future in futures.items()}
+            if catalog_version() == version:
+                return cls.from_sources(sources, version)
+        raise RuntimeError(f"Catalog sources kept changing over {CATALOG_LOAD_ATTEMPTS} load attempts")
+
+    @classmethod
+    def open_shared(cls, path: str) -> "Catalog":
+        # Rows stay in the shared mapping, which is also what the version is hashed from
+        tables = open_shared_catalog(path)
+        return cls.from_sources(tables, shared_catalog_version(tables))
+
+
+class CatalogManager:
+    # Holds the current Catalog and swaps in a rebuilt one when its source files change. Requests
+    # read `current` once and keep that snapshot, so in-flight work finishes on the old catalog
+    def __init__(
+        self,
+        load: Callable[[], Catalog],
+        files: Sequence[str],
+        interval: float = CATALOG_POLL_INTERVAL,
+        watch: bool = CATALOG_RELOAD,
+    ):
+        self.load = load
+        self.files = tuple(files)
+        self.interval = interval
+        self.listeners: List[Callable[[Catalog], None]] = []
+        self.file_state = self.stat()
+        # File state of the last failed reload, not retried until the files change again
+        self.failed_state = None
+        self.current = load()
+        self.stopped = threading.Event()
+        self.thread = None
+        if watch:
+            self.thread = threading.Thread(target=self.watch_loop, name="catalog-reload", daemon=True)
+            self.thread.start()
+
+    def stat(self) -> FILE_STATE_DATA_TYPE:
+        state = []
+        for file in self.files:
+            try:
+                stat = os.stat(file)
+            except OSError:
+                state.append(None)
+            else:
+                state.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(state)
+
+    def add_listener(self, listener: Callable[[Catalog], None]) -> None:
+        # Called with the new catalog after every swap
+        self.listeners.append(listener)
+
+    def reload_if_changed(self) -> bool:
+        state = self.stat()
+        if state == self.file_state or state == self.failed_state:
+            return False
+        try:
+            catalog = self.load()
+        except Exception:
+            # Most likely a file caught halfway through being saved; keep serving the old catalog until
+            # the files change again
+            logger.exception("Catalog reload failed, keeping version %s", self.current.version)
+            self.failed_state = state
+            return False
+        self.file_state = state
+        if catalog.version == self.current.version:
+            return False
+        self.current = catalog
+        logger.info("Catalog reloaded, version %s", catalog.version)
+        for listener in self.listeners:
+            listener(catalog)
+        return True
+
+    def watch_loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.reload_if_changed()
+
+    def close(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    @classmethod
+    def for_sources(cls, shared_catalog: Optional[str] = None, **kwargs) -> "CatalogManager":
+        if shared_catalog:
+            return cls(lambda: Catalog.open_shared(shared_catalog), (shared_catalog,), **kwargs)
+        return cls(Catalog.load, [file for _, file in SOURCES], **kwargs)
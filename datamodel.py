@@ -1,13 +1,110 @@
+import mmap
+import os
 import random
-from typing import Dict, Optional, Tuple, Union
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 import json
 import attr
 
+from bundle import bundled
+
 TRAITS_DATA_TYPE = Tuple[Dict[str, str], ...]
 SPELL_CLASSES_DATA_TYPE = Tuple[str, ...]
 SPELL_COMPONENTS_DATA_TYPE = Dict[str, Union[str, bool]]
 SPELL_TAGS_DATA_TYPE = Tuple[str, ...]
 
+# Keep long text fields (spell descriptions, race traits, feat text) in a sidecar file and read them on access
+LAZY_TEXT = os.environ.get("DND5_LAZY_TEXT") == "1"
+
+
+class TextStore:
+    def __init__(self, path: str):
+        self.path = path
+        # Mapped up front so a loaded catalog keeps reading the file it was built from, even after a
+        # reload replaces the file on disk
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def read(self, offset: int, length: int) -> Any:
+        return json.loads(self._map[offset : offset + length])
+
+    def __reduce__(self):
+        return TextStore, (self.path,)
+
+
+class LazyText:
+    __slots__ = ("store", "offset", "length")
+
+    def __init__(self, store: TextStore, offset: int, length: int):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+    @property
+    def value(self) -> Any:
+        return self.store.read(self.offset, self.length)
+
+    def __str__(self) -> str:
+        value = self.value
+        return value if isinstance(value, str) else str(value)
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LazyText):
+            return NotImplemented
+        return (self.store.path, self.offset, self.length) == (other.store.path, other.offset, other.length)
+
+    def __hash__(self) -> int:
+        return hash((self.store.path, self.offset, self.length))
+
+    def __repr__(self) -> str:
+        return f"LazyText({self.store.path!r}, {self.offset}, {self.length})"
+
+    def __reduce__(self):
+        return LazyText, (self.store, self.offset, self.length)
+
+
+def store_lazy_text(source_file: str, values: Sequence[Any]) -> List[Optional[LazyText]]:
+    blobs = [None if value is None else json.dumps(value).encode("utf8") for value in values]
+    data = b"".join(blob for blob in blobs if blob is not None)
+    path = source_file + ".text"
+    try:
+        with open(path, "rb") as f:
+            up_to_date = f.read() == data
+    except OSError:
+        up_to_date = False
+    if not up_to_date:
+        # Workers starting together all write the same bytes, each through its own temp file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another writer got there first and still holds the file (Windows refuses to replace
+            # a mapped file); its copy is just as good
+            os.remove(tmp_path)
+
+    store = TextStore(path)
+    lazy_values = []
+    offset = 0
+    for blob in blobs:
+        if blob is None:
+            lazy_values.append(None)
+        else:
+            lazy_values.append(LazyText(store, offset, len(blob)))
+            offset += len(blob)
+    return lazy_values
+
 
 @attr.frozen
 class Race:
@@ -15,7 +112,7 @@ class Race:
     source: str
     size: str
     speed: int
-    traits: TRAITS_DATA_TYPE
+    traits: Union[TRAITS_DATA_TYPE, LazyText]
     str: int = 0
     dex: int = 0
     con: int = 0
@@ -33,10 +130,10 @@ class Spell:
     casting_time: str
     classes: SPELL_CLASSES_DATA_TYPE
     components: SPELL_COMPONENTS_DATA_TYPE
-    description: str
+    description: Union[str, LazyText]
     duration: str
     level: str
-    higher_levels: str
+    higher_levels: Optional[Union[str, LazyText]]
     name: str
     range: str
     ritual: bool
@@ -45,6 +142,185 @@ class Spell:
     type: str
 
 
+SIMPLE_WEAPONS = ("Simple Ranged Weapons", "Simple Melee Weapons")
+MARTIAL_MELEE_WEAPONS = SIMPLE_WEAPONS + ("Martial Melee Weapons",)
+MARTIAL_WEAPONS = MARTIAL_MELEE_WEAPONS + ("Martial Ranged Weapons",)
+WEAPON_PROFICIENCIES = {
+    "Bard": MARTIAL_MELEE_WEAPONS,
+    "Rogue": MARTIAL_MELEE_WEAPONS,
+    "Barbarian": MARTIAL_WEAPONS,
+    "Warrior": MARTIAL_WEAPONS,
+    "Paladin": MARTIAL_WEAPONS,
+    "Ranger": MARTIAL_WEAPONS,
+    "Wizard": SIMPLE_WEAPONS,
+    "Druid": SIMPLE_WEAPONS,
+    "Cleric": SIMPLE_WEAPONS,
+    "Warlock": SIMPLE_WEAPONS,
+    "Monk": SIMPLE_WEAPONS,
+    "Sorcerer": SIMPLE_WEAPONS,
+}
+
+LIGHT_ARMOR = ("Light Armor",)
+MEDIUM_ARMOR = ("Light Armor", "Medium Armor", "Shield")
+HEAVY_ARMOR = ("Light Armor", "Medium Armor", "Heavy Armor", "Shield")
+ARMOR_PROFICIENCIES = {
+    "Bard": LIGHT_ARMOR,
+    "Warlock": LIGHT_ARMOR,
+    "Rogue": LIGHT_ARMOR,
+    "Barbarian": MEDIUM_ARMOR,
+    "Druid": MEDIUM_ARMOR,
+    "Cleric": MEDIUM_ARMOR,
+    "Ranger": MEDIUM_ARMOR,
+    "Warrior": HEAVY_ARMOR,
+    "Paladin": HEAVY_ARMOR,
+    "Wizard": (),
+    "Monk": (),
+    "Sorcerer": (),
+}
+
+CANTRIP_CLASSES = frozenset(["Wizard", "Warrior", "Sorcerer", "Druid", "Bard", "Cleric", "Warlock", "Rogue"])
+
+HIT_DICE = {
+    "Barbarian": 12,
+    "Bard": 8,
+    "Druid": 8,
+    "Cleric": 8,
+    "Warlock": 8,
+    "Monk": 8,
+    "Rogue": 8,
+    "Warrior": 10,
+    "Paladin": 10,
+    "Ranger": 10,
+    "Wizard": 6,
+    "Sorcerer": 6,
+}
+
+# Spell slots of spell levels 1-9 for each character level 1-20
+FULL_CASTER_SLOTS = (
+    (2, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 1, 0, 0, 0, 0, 0),
+    (4, 3, 3, 2, 0, 0, 0, 0, 0),
+    (4, 3, 3, 3, 1, 0, 0, 0, 0),
+    (4, 3, 3, 3, 2, 0, 0, 0, 0),
+    (4, 3, 3, 3, 2, 1, 0, 0, 0),
+    (4, 3, 3, 3, 2, 1, 0, 0, 0),
+    (4, 3, 3, 3, 2, 1, 1, 0, 0),
+    (4, 3, 3, 3, 2, 1, 1, 0, 0),
+    (4, 3, 3, 3, 2, 1, 1, 1, 0),
+    (4, 3, 3, 3, 2, 1, 1, 1, 0),
+    (4, 3, 3, 3, 2, 1, 1, 1, 1),
+    (4, 3, 3, 3, 3, 1, 1, 1, 1),
+    (4, 3, 3, 3, 3, 2, 1, 1, 1),
+    (4, 3, 3, 3, 3, 2, 2, 1, 1),
+)
+HALF_CASTER_SLOTS = (
+    (0, 0, 0, 0, 0, 0, 0, 0, 0),
+    (2, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 1, 0, 0, 0, 0, 0),
+    (4, 3, 3, 1, 0, 0, 0, 0, 0),
+    (4, 3, 3, 2, 0, 0, 0, 0, 0),
+    (4, 3, 3, 2, 0, 0, 0, 0, 0),
+    (4, 3, 3, 3, 1, 0, 0, 0, 0),
+    (4, 3, 3, 3, 1, 0, 0, 0, 0),
+    (4, 3, 3, 3, 2, 0, 0, 0, 0),
+    (4, 3, 3, 3, 2, 0, 0, 0, 0),
+)
+THIRD_CASTER_SLOTS = (
+    (0, 0, 0, 0, 0, 0, 0, 0, 0),
+    (0, 0, 0, 0, 0, 0, 0, 0, 0),
+    (2, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (3, 0, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 2, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 0, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 2, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 0, 0, 0, 0, 0, 0),
+    (4, 3, 3, 1, 0, 0, 0, 0, 0),
+    (4, 3, 3, 1, 0, 0, 0, 0, 0),
+)
+PACT_MAGIC_SLOTS = (
+    (1, 0, 0, 0, 0, 0, 0, 0, 0),
+    (2, 0, 0, 0, 0, 0, 0, 0, 0),
+    (0, 2, 0, 0, 0, 0, 0, 0, 0),
+    (0, 2, 0, 0, 0, 0, 0, 0, 0),
+    (0, 0, 2, 0, 0, 0, 0, 0, 0),
+    (0, 0, 2, 0, 0, 0, 0, 0, 0),
+    (0, 0, 0, 2, 0, 0, 0, 0, 0),
+    (0, 0, 0, 2, 0, 0, 0, 0, 0),
+    (0, 0, 0, 0, 2, 0, 0, 0, 0),
+    (0, 0, 0, 0, 2, 0, 0, 0, 0),
+    (0, 0, 0, 0, 3, 0, 0, 0, 0),
+    (0, 0, 0, 0, 3, 0, 0, 0, 0),
+    (0, 0, 0, 0, 3, 0, 0, 0, 0),
+    (0, 0, 0, 0, 3, 0, 0, 0, 0),
+    (0, 0, 0, 0, 3, 0, 0, 0, 0),
+    (0, 0, 0, 0, 4, 0, 0, 0, 0),
+    (0, 0, 0, 0, 4, 0, 0, 0, 0),
+    (0, 0, 0, 0, 4, 0, 0, 0, 0),
+    (0, 0, 0, 0, 4, 0, 0, 0, 0),
+    (0, 0, 0, 0, 4, 0, 0, 0, 0),
+)
+# Cantrips known at character levels 1, 4 and 10
+FULL_CASTER_CANTRIPS = {
+    "Wizard": (3, 4, 5),
+    "Cleric": (3, 4, 5),
+    "Bard": (2, 3, 4),
+    "Druid": (2, 3, 4),
+    "Sorcerer": (4, 5, 6),
+}
+THIRD_CASTER_CANTRIPS = {"Warrior": (2, 2, 3), "Rogue": (3, 3, 4)}
+
+
+def build_spell_slots(
+    slots: Tuple[Tuple[int, ...], ...], cantrips: Tuple[int, int, int], first_level: int = 1
+) -> Mapping[int, Tuple[int, ...]]:
+    # Row per character level: cantrips known, then spell slots of spell levels 1-9; no cantrips before
+    # the first spell slot
+    def cantrips_at(level: int) -> int:
+        if not any(slots[level - 1]):
+            return 0
+        return cantrips[0] if level < 4 else cantrips[1] if level < 10 else cantrips[2]
+
+    return MappingProxyType(
+        {level: (cantrips_at(level),) + slots[level - 1] for level in range(first_level, 21)}
+    )
+
+
+SPELL_SLOTS = {
+    **{name: build_spell_slots(FULL_CASTER_SLOTS, cantrips) for name, cantrips in FULL_CASTER_CANTRIPS.items()},
+    "Warrior": build_spell_slots(THIRD_CASTER_SLOTS, THIRD_CASTER_CANTRIPS["Warrior"], first_level=3),
+    "Rogue": build_spell_slots(THIRD_CASTER_SLOTS, THIRD_CASTER_CANTRIPS["Rogue"]),
+    "Warlock": build_spell_slots(PACT_MAGIC_SLOTS, (2, 3, 4)),
+    "Paladin": build_spell_slots(HALF_CASTER_SLOTS, (0, 0, 0)),
+    "Ranger": build_spell_slots(HALF_CASTER_SLOTS, (0, 0, 0)),
+}
+NO_SPELL_SLOTS = MappingProxyType({})
+
+
 @attr.frozen
 class Class:
     name: str
@@ -54,284 +330,28 @@ class Class:
     int: bool
     wis: bool
     cha: bool
+    # Hit die size from classes.json; classes without one fall back to HIT_DICE
+    hd: Optional[int] = None
 
     @property
     def weapon_proficiencies(self) -> Tuple[str, ...]:
-        if self.name == "Bard" or self.name == "Rogue":
-            return ("Simple Ranged Weapons", "Simple Melee Weapons", "Martial Melee Weapons")
-        elif (
-            self.name == "Barbarian"
-            or self.name == "Warrior"
-            or self.name == "Paladin"
-            or self.name == "Ranger"
-        ):
-            return (
-                "Simple Ranged Weapons",
-                "Simple Melee Weapons",
-                "Martial Melee Weapons",
-                "Martial Ranged Weapons",
-            )
-        elif (
-            self.name == "Wizard"
-            or self.name == "Druid"
-            or self.name == "Cleric"
-            or self.name == "Warlock"
-            or self.name == "Monk"
-            or self.name == "Sorcerer"
-        ):
-            return ("Simple Ranged Weapons", "Simple Melee Weapons")
+        return WEAPON_PROFICIENCIES.get(self.name)
 
     @property
     def armor_proficiencies(self) -> Tuple[str, ...]:
-        if self.name == "Bard" or self.name == "Warlock" or self.name == "Rogue":
-            return ("Light Armor",)
-        elif (
-            self.name == "Barbarian" or self.name == "Druid" or self.name == "Cleric" or self.name == "Ranger"
-        ):
-            return ("Light Armor", "Medium Armor", "Shield")
-        elif self.name == "Warrior" or self.name == "Paladin":
-            return ("Light Armor", "Medium Armor", "Heavy Armor", "Shield")
-        elif self.name == "Wizard" or self.name == "Monk" or self.name == "Sorcerer":
-            return ()
+        return ARMOR_PROFICIENCIES.get(self.name)
 
     @property
     def has_cantrip(self) -> bool:
-        if self.name in ["Wizard", "Warrior", "Sorcerer", "Druid", "Bard", "Cleric", "Warlock", "Rogue"]:
-            return True
-        return False
+        return self.name in CANTRIP_CLASSES
 
     @property
-    def class_abilities(self):
-        if self.name == "Wizard":
-            return {
-                1: [3, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [3, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [3, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                4: [4, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                5: [4, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                6: [4, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                7: [4, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                8: [4, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                9: [4, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                10: [5, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                11: [5, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                12: [5, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                13: [5, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                14: [5, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                15: [5, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                16: [5, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                17: [5, 4, 3, 3, 3, 2, 1, 1, 1, 1],
-                18: [5, 4, 3, 3, 3, 3, 1, 1, 1, 1],
-                19: [5, 4, 3, 3, 3, 3, 2, 1, 1, 1],
-                20: [5, 4, 3, 3, 3, 3, 2, 2, 1, 1],
-            }
-        elif self.name == "Warrior":
-            return {
-                3: [2, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                4: [2, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                5: [2, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                6: [2, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                7: [2, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                8: [2, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                9: [2, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                10: [3, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                11: [3, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                12: [3, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                13: [3, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                14: [3, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                15: [3, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                16: [3, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                17: [3, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                18: [3, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                19: [3, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                20: [3, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-            }
-        elif self.name == "Bard":
-            return {
-                1: [2, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [2, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [2, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                4: [3, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                5: [3, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                6: [3, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                7: [3, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                8: [3, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                9: [3, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                10: [4, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                11: [4, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                12: [4, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                13: [4, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                14: [4, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                15: [4, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                16: [4, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                17: [4, 4, 3, 3, 3, 2, 1, 1, 1, 1],
-                18: [4, 4, 3, 3, 3, 3, 1, 1, 1, 1],
-                19: [4, 4, 3, 3, 3, 3, 2, 1, 1, 1],
-                20: [4, 4, 3, 3, 3, 3, 2, 2, 1, 1],
-            }
-        elif self.name == "Druid":
-            return {
-                1: [2, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [2, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [2, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                4: [3, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                5: [3, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                6: [3, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                7: [3, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                8: [3, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                9: [3, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                10: [4, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                11: [4, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                12: [4, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                13: [4, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                14: [4, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                15: [4, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                16: [4, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                17: [4, 4, 3, 3, 3, 2, 1, 1, 1, 1],
-                18: [4, 4, 3, 3, 3, 3, 1, 1, 1, 1],
-                19: [4, 4, 3, 3, 3, 3, 2, 1, 1, 1],
-                20: [4, 4, 3, 3, 3, 3, 2, 2, 1, 1],
-            }
-        elif self.name == "Cleric":
-            return {
-                1: [3, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [3, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [3, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                4: [4, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                5: [4, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                6: [4, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                7: [4, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                8: [4, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                9: [4, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                10: [5, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                11: [5, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                12: [5, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                13: [5, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                14: [5, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                15: [5, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                16: [5, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                17: [5, 4, 3, 3, 3, 2, 1, 1, 1, 1],
-                18: [5, 4, 3, 3, 3, 3, 1, 1, 1, 1],
-                19: [5, 4, 3, 3, 3, 3, 2, 1, 1, 1],
-                20: [5, 4, 3, 3, 3, 3, 2, 2, 1, 1],
-            }
-        elif self.name == "Warlock":
-            return {
-                1: [2, 1, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [2, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [2, 0, 2, 0, 0, 0, 0, 0, 0, 0],
-                4: [3, 0, 2, 0, 0, 0, 0, 0, 0, 0],
-                5: [3, 0, 0, 2, 0, 0, 0, 0, 0, 0],
-                6: [3, 0, 0, 2, 0, 0, 0, 0, 0, 0],
-                7: [3, 0, 0, 0, 2, 0, 0, 0, 0, 0],
-                8: [3, 0, 0, 0, 2, 0, 0, 0, 0, 0],
-                9: [3, 0, 0, 0, 0, 2, 0, 0, 0, 0],
-                10: [4, 0, 0, 0, 0, 2, 0, 0, 0, 0],
-                11: [4, 0, 0, 0, 0, 3, 0, 0, 0, 0],
-                12: [4, 0, 0, 0, 0, 3, 0, 0, 0, 0],
-                13: [4, 0, 0, 0, 0, 3, 0, 0, 0, 0],
-                14: [4, 0, 0, 0, 0, 3, 0, 0, 0, 0],
-                15: [4, 0, 0, 0, 0, 3, 0, 0, 0, 0],
-                16: [4, 0, 0, 0, 0, 4, 0, 0, 0, 0],
-                17: [4, 0, 0, 0, 0, 4, 0, 0, 0, 0],
-                18: [4, 0, 0, 0, 0, 4, 0, 0, 0, 0],
-                19: [4, 0, 0, 0, 0, 4, 0, 0, 0, 0],
-                20: [4, 0, 0, 0, 0, 4, 0, 0, 0, 0],
-            }
-        elif self.name == "Paladin":
-            return {
-                1: [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [0, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [0, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                4: [0, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                5: [0, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                6: [0, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                7: [0, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                8: [0, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                9: [0, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                10: [0, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                11: [0, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                12: [0, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                13: [0, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                14: [0, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                15: [0, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                16: [0, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                17: [0, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                18: [0, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                19: [0, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                20: [0, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-            }
-        elif self.name == "Rogue":
-            return {
-                1: [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [3, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                4: [3, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                5: [3, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                6: [3, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                7: [3, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                8: [3, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                9: [3, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                10: [4, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                11: [4, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                12: [4, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                13: [4, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                14: [4, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                15: [4, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                16: [4, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                17: [4, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                18: [4, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                19: [4, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                20: [4, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-            }
-        elif self.name == "Ranger":
-            return {
-                1: [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [0, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [0, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                4: [0, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                5: [0, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                6: [0, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                7: [0, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                8: [0, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                9: [0, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                10: [0, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                11: [0, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                12: [0, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                13: [0, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                14: [0, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                15: [0, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                16: [0, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                17: [0, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                18: [0, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                19: [0, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                20: [0, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-            }
-        elif self.name == "Sorcerer":
-            return {
-                1: [4, 2, 0, 0, 0, 0, 0, 0, 0, 0],
-                2: [4, 3, 0, 0, 0, 0, 0, 0, 0, 0],
-                3: [4, 4, 2, 0, 0, 0, 0, 0, 0, 0],
-                4: [5, 4, 3, 0, 0, 0, 0, 0, 0, 0],
-                5: [5, 4, 3, 2, 0, 0, 0, 0, 0, 0],
-                6: [5, 4, 3, 3, 0, 0, 0, 0, 0, 0],
-                7: [5, 4, 3, 3, 1, 0, 0, 0, 0, 0],
-                8: [5, 4, 3, 3, 2, 0, 0, 0, 0, 0],
-                9: [5, 4, 3, 3, 3, 1, 0, 0, 0, 0],
-                10: [6, 4, 3, 3, 3, 2, 0, 0, 0, 0],
-                11: [6, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                12: [6, 4, 3, 3, 3, 2, 1, 0, 0, 0],
-                13: [6, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                14: [6, 4, 3, 3, 3, 2, 1, 1, 0, 0],
-                15: [6, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                16: [6, 4, 3, 3, 3, 2, 1, 1, 1, 0],
-                17: [6, 4, 3, 3, 3, 2, 1, 1, 1, 1],
-                18: [6, 4, 3, 3, 3, 3, 1, 1, 1, 1],
-                19: [6, 4, 3, 3, 3, 3, 2, 1, 1, 1],
-                20: [6, 4, 3, 3, 3, 3, 2, 2, 1, 1],
-            }
-        else:
-            return {}
+    def class_abilities(self) -> Mapping[int, Tuple[int, ...]]:
+        return SPELL_SLOTS.get(self.name, NO_SPELL_SLOTS)
+
+    @property
+    def hit_die(self) -> Optional[int]:
+        return self.hd if self.hd is not None else HIT_DICE.get(self.name)
 
 
 SHEET_SPELLS_DATA_TYPE = Tuple[Tuple[Spell, ...]]
@@ -503,8 +523,98 @@ class Item:
     type: str
 
 
-def generate_random_hp(base: int, con_mod: int, level: int) -> int:
-    return sum([random.randint(1, base) + con_mod for _ in range(level - 1)]) + base + con_mod
+EQUIPMENT_INDEX_DATA_TYPE = Dict[Tuple[str, ...], Tuple[int, ...]]
+
+
+@attr.frozen
+class EquipmentCatalog:
+    # A tuple, or a shared catalog table that decodes an item only when it is looked up
+    items: Sequence[Item]
+    # The indexes below hold positions in items rather than the items themselves
+    by_type: Dict[str, Tuple[int, ...]] = attr.field(init=False, eq=False, repr=False)
+    # Candidate items per proficiency set, filled for every class up front and on demand otherwise
+    armor_index: EQUIPMENT_INDEX_DATA_TYPE = attr.field(init=False, eq=False, repr=False)
+    weapon_index: EQUIPMENT_INDEX_DATA_TYPE = attr.field(init=False, eq=False, repr=False)
+
+    def __attrs_post_init__(self):
+        by_type = {}
+        for i, item in enumerate(self.items):
+            by_type.setdefault(item.type, []).append(i)
+        object.__setattr__(self, "by_type", {item_type: tuple(indices) for item_type, indices in by_type.items()})
+        object.__setattr__(self, "armor_index", {})
+        object.__setattr__(self, "weapon_index", {})
+        for proficiencies in ARMOR_PROFICIENCIES.values():
+            self.armor_for(proficiencies)
+        for proficiencies in WEAPON_PROFICIENCIES.values():
+            self.weapons_for(proficiencies)
+
+    def _candidates(self, proficiencies: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(i for item_type in proficiencies for i in self.by_type.get(item_type, ()))
+
+    def armor_for(self, proficiencies: Tuple[str, ...]) -> Tuple[int, ...]:
+        armor = self.armor_index.get(proficiencies)
+        if armor is None:
+            armor = self.armor_index[proficiencies] = self._candidates(
+                tuple(item_type for item_type in proficiencies if item_type != "Shield")
+            )
+        return armor
+
+    def weapons_for(self, proficiencies: Tuple[str, ...]) -> Tuple[int, ...]:
+        weapons = self.weapon_index.get(proficiencies)
+        if weapons is None:
+            weapons = self.weapon_index[proficiencies] = self._candidates(proficiencies)
+        return weapons
+
+    @property
+    def shield(self) -> Optional[Item]:
+        shields = self.by_type.get("Shield")
+        return self.items[shields[0]] if shields else None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def generate_random_hp(base: int, con_mod: int, level: int, rng: Optional[random.Random] = None) -> int:
+    rng = rng or random
+    return sum([rng.randint(1, base) + con_mod for _ in range(level - 1)]) + base + con_mod
+
+
+@attr.frozen
+class SheetStats:
+    hp: int
+    bm: int
+    passive_perception: int
+    str: int
+    dex: int
+    con: int
+    wis: int
+    int: int
+    cha: int
+    str_mod: int
+    dex_mod: int
+    con_mod: int
+    wis_mod: int
+    int_mod: int
+    cha_mod: int
+
+
+def get_proficiency_bonus(level: int) -> int:
+    if level < 5:
+        return 2
+    elif level >= 5 and level < 9:
+        return 3
+    elif level >= 9 and level < 13:
+        return 4
+    elif level >= 13 and level < 17:
+        return 5
+    elif level >= 17:
+        return 6
 
 
 @attr.frozen
@@ -524,98 +634,114 @@ class Sheet:
     base_int: int
     base_cha: int
     feats: Optional[Tuple] = None
+    # Seeds the hit dice rolls so a seeded sheet always gets the same hp
+    hp_seed: Optional[int] = None
+    # Derived stats, computed once when the sheet is built
+    stats: SheetStats = attr.field(init=False, eq=False, repr=False)
+
+    def __attrs_post_init__(self):
+        scores = (
+            self.base_str + self.race.str,
+            self.base_dex + self.race.dex,
+            self.base_con + self.race.con,
+            self.base_wis + self.race.wis,
+            self.base_int + self.race.int,
+            self.base_cha + self.race.cha,
+        )
+        mods = tuple((score - 10) // 2 for score in scores)
+        hit_die = self.cl.hit_die
+        rng = None if self.hp_seed is None else random.Random(self.hp_seed)
+        hp = None if hit_die is None else generate_random_hp(hit_die, mods[2], self.level, rng)
+        stats = SheetStats(hp, get_proficiency_bonus(self.level), 10 + mods[3], *scores, *mods)
+        object.__setattr__(self, "stats", stats)
 
     @property
     def hp(self):
-        if self.cl.name == "Barbarian":
-            return generate_random_hp(12, self.con_mod, self.level)
-        elif (
-            self.cl.name == "Bard"
-            or self.cl.name == "Druid"
-            or self.cl.name == "Cleric"
-            or self.cl.name == "Warlock"
-            or self.cl.name == "Monk"
-            or self.cl.name == "Rogue"
-        ):
-            return generate_random_hp(8, self.con_mod, self.level)
-        elif self.cl.name == "Warrior" or self.cl.name == "Paladin" or self.cl.name == "Ranger":
-            return generate_random_hp(10, self.con_mod, self.level)
-        elif self.cl.name == "Wizard" or self.cl.name == "Sorcerer":
-            return generate_random_hp(6, self.con_mod, self.level)
+        return self.stats.hp
 
     @property
     def bm(self):
-        if self.level < 5:
-            return 2
-        elif self.level >= 5 and self.level < 9:
-            return 3
-        elif self.level >= 9 and self.level < 13:
-            return 4
-        elif self.level >= 13 and self.level < 17:
-            return 5
-        elif self.level >= 17:
-            return 6
+        return self.stats.bm
 
     @property
     def passive_perception(self):
-        return 10 + self.wis_mod
+        return self.stats.passive_perception
 
     @property
     def str(self):
-        return self.base_str + self.race.str
+        return self.stats.str
 
     @property
     def dex(self):
-        return self.base_dex + self.race.dex
+        return self.stats.dex
 
     @property
     def con(self):
-        return self.base_con + self.race.con
+        return self.stats.con
 
     @property
     def wis(self):
-        return self.base_wis + self.race.wis
+        return self.stats.wis
 
     @property
     def int(self):
-        return self.base_int + self.race.int
+        return self.stats.int
 
     @property
     def cha(self):
-        return self.base_cha + self.race.cha
+        return self.stats.cha
 
     @property
     def str_mod(self):
-        return (self.str - 10) // 2
+        return self.stats.str_mod
 
     @property
     def dex_mod(self):
-        return (self.dex - 10) // 2
+        return self.stats.dex_mod
 
     @property
     def con_mod(self):
-        return (self.con - 10) // 2
+        return self.stats.con_mod
 
     @property
     def wis_mod(self):
-        return (self.wis - 10) // 2
+        return self.stats.wis_mod
 
     @property
     def int_mod(self):
-        return (self.int - 10) // 2
+        return self.stats.int_mod
 
     @property
     def cha_mod(self):
-        return (self.cha - 10) // 2
+        return self.stats.cha_mod
+
+    def to_dict(self) -> Dict:
+        armor, weapon, shield = self.items
+        return {
+            "name": self.name,
+            "level": self.level,
+            "rating": self.rating,
+            "race": self.race.name,
+            "class": self.cl.name,
+            "subclass": self.sub_cl.name,
+            "notice": self.sub_cl.notice,
+            **attr.asdict(self.stats),
+            "armor": armor.name if armor else None,
+            "weapon": weapon.name if weapon else None,
+            "shield": bool(shield),
+            "spells": None if self.spells is None else [[spell.name for spell in level] for level in self.spells],
+            "feats": [] if self.feats is None else [feat.name for feat in self.feats],
+        }
 
 
 @attr.frozen
 class Feat:
     name: str
-    text: Tuple[str, ...]
+    text: Union[Tuple[str, ...], LazyText]
 
 
-def load_available_races(file: str) -> Tuple[Race, ...]:
+@bundled
+def load_available_races(file: str, lazy: bool = LAZY_TEXT) -> Tuple[Race, ...]:
     def get_abilities_from_text(text: str) -> Dict[str, Optional[int]]:
         abilities = {
             "Str": 0,
@@ -631,12 +757,19 @@ def load_available_races(file: str) -> Tuple[Race, ...]:
             abilities[ability_splited[0]] = int(ability_splited[1])
         return abilities.values()
 
+    source_file = file
     # Open the JSON file for reading
     with open(file, "r", encoding="utf8") as file:
         # Parse JSON file
         raw_races = json.load(file)
+    traits = [
+        tuple([{"name": t["name"], "text": t["text"]} for t in race["trait"]])
+        for race in raw_races["compendium"]["race"]
+    ]
+    if lazy:
+        traits = store_lazy_text(source_file, traits)
     available_races = []
-    for race in raw_races["compendium"]["race"]:
+    for race, race_traits in zip(raw_races["compendium"]["race"], traits):
         abilities = get_abilities_from_text(race["ability"])
         available_races.append(
             Race(
@@ -644,25 +777,80 @@ def load_available_races(file: str) -> Tuple[Race, ...]:
                 race["source"],
                 race["size"],
                 int(race["speed"]),
-                tuple([{"name": t["name"], "text": t["text"]} for t in race["trait"]]),
+                race_traits,
                 *abilities
             )
         )
     return tuple(available_races)
 
 
-def load_available_spells(file: str) -> Tuple[Spell, ...]:
+@bundled
+def load_available_spells(file: str, lazy: bool = LAZY_TEXT) -> Tuple[Spell, ...]:
     def parse_higher_levels(spell: Dict) -> Dict:
         if "higher_levels" not in spell.keys():
             spell["higher_levels"] = None
         return spell
 
+    source_file = file
     with open(file, "r", encoding="utf8") as file:
         # Parse JSON file
-        raw_spells = json.load(file)
-    return tuple([Spell(**parse_higher_levels(spell)) for spell in raw_spells])
+        raw_spells = [parse_higher_levels(spell) for spell in json.load(file)]
+    if lazy:
+        lazy_fields = store_lazy_text(
+            source_file,
+            [spell["description"] for spell in raw_spells] + [spell["higher_levels"] for spell in raw_spells],
+        )
+        for spell, description, higher_levels in zip(
+            raw_spells, lazy_fields[: len(raw_spells)], lazy_fields[len(raw_spells) :]
+        ):
+            spell["description"] = description
+            spell["higher_levels"] = higher_levels
+    return tuple([Spell(**spell) for spell in raw_spells])
+
 
+SPELL_INDEX_KEY_TYPE = Tuple[str, int, Optional[str]]
 
+
+@attr.frozen
+class SpellIndex:
+    # (class, spell level, school) -> positions in spells; school None holds the whole level
+    buckets: Dict[SPELL_INDEX_KEY_TYPE, Tuple[int, ...]]
+    # (class, spell level, school) -> positions of the spells of that level outside the school
+    complements: Dict[SPELL_INDEX_KEY_TYPE, Tuple[int, ...]]
+    # Every indexed spell in catalog order; a shared catalog table decodes a spell only when it is drawn
+    spells: Sequence[Spell] = attr.field(default=(), eq=False, repr=False)
+
+    @classmethod
+    def from_spells(cls, available_spells: Sequence[Spell]) -> "SpellIndex":
+        buckets = {}
+        schools = []
+        for i, spell in enumerate(available_spells):
+            level = 0 if spell.level == "cantrip" else int(spell.level)
+            schools.append(spell.school)
+            for cl_name in spell.classes:
+                buckets.setdefault((cl_name, level, None), []).append(i)
+                buckets.setdefault((cl_name, level, spell.school), []).append(i)
+        complements = {}
+        for (cl_name, level, school), indices in buckets.items():
+            if school is None:
+                for other_school in set(schools):
+                    complements[(cl_name, level, other_school)] = tuple(
+                        i for i in indices if schools[i] != other_school
+                    )
+        return cls({key: tuple(indices) for key, indices in buckets.items()}, complements, available_spells)
+
+    def get(self, cl_name: str, level: int, school: Optional[str] = None) -> Tuple[int, ...]:
+        return self.buckets.get((cl_name.lower(), level, school and school.lower()), ())
+
+    def get_complement(self, cl_name: str, level: int, school: str) -> Tuple[int, ...]:
+        complement = self.complements.get((cl_name.lower(), level, school.lower()))
+        if complement is None:
+            # No indexed spell has that school, so every spell of the level is outside it
+            return self.get(cl_name, level)
+        return complement
+
+
+@bundled
 def load_available_classes(file: str) -> Tuple[Class, ...]:
     def get_proficiency_from_text(text: str) -> Dict[str, bool]:
         proficiency = {"str": False, "dex": False, "con": False, "int": False, "wis": False, "cha": False}
@@ -682,16 +870,27 @@ def load_available_classes(file: str) -> Tuple[Class, ...]:
     with open(file, "r", encoding="utf8") as file:
         # Parse JSON file
         raw_classes = json.load(file)
-    return tuple([Class(cl["name"], **get_proficiency_from_text(cl["proficiency"])) for cl in raw_classes])
+    return tuple(
+        [
+            Class(cl["name"], **get_proficiency_from_text(cl["proficiency"]), hd=int(cl["hd"]) if "hd" in cl else None)
+            for cl in raw_classes
+        ]
+    )
 
 
-def load_available_feats(file: str) -> Tuple[Feat, ...]:
+@bundled
+def load_available_feats(file: str, lazy: bool = LAZY_TEXT) -> Tuple[Feat, ...]:
+    source_file = file
     with open(file, "r", encoding="utf8") as file:
         # Parse JSON file
         raw_feats = json.load(file)
-    return tuple([Feat(feat["name"], feat["text"]) for feat in raw_feats])
+    texts = [feat["text"] for feat in raw_feats]
+    if lazy:
+        texts = store_lazy_text(source_file, texts)
+    return tuple([Feat(feat["name"], text) for feat, text in zip(raw_feats, texts)])
 
 
+@bundled
 def load_names(file: str) -> Tuple[str, ...]:
     with open(file, "r", encoding="utf8") as file:
         # Parse JSON file
@@ -699,7 +898,8 @@ def load_names(file: str) -> Tuple[str, ...]:
     return tuple(raw_names)
 
 
-def load_available_equipment(file: str) -> Tuple[Item, ...]:
+@bundled
+def load_available_equipment(file: str) -> EquipmentCatalog:
     with open(file, "r", encoding="utf8") as file:
         # Parse JSON file
         raw_names = json.load(file)["Equipment"]
@@ -810,7 +1010,7 @@ def load_available_equipment(file: str) -> Tuple[Item, ...]:
             )
         ]
     )
-    return (
+    return EquipmentCatalog(
         available_heavy_armor
         + available_light_armor
         + available_martial_melee_weapons
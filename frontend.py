@@ -1,23 +1,36 @@
-from flask import Flask, render_template, request
-from datamodel import (
-    load_available_races,
-    load_available_spells,
-    load_available_classes,
-    load_available_feats,
-    load_names,
-    load_available_equipment,
-)
-from randomize import generate_character, generate_level
-
-AVAILABLE_RACES = load_available_races("races.json")
-AVAILABLE_SPELLS = load_available_spells("spells.json")
-AVAILABLE_CLASSES = load_available_classes("classes.json")
-AVAILABLE_FEATS = load_available_feats("feats.json")
-ALAILABLE_FIRST_NAMES = load_names("first-names.json")
-AVAILABLE_MIDDLE_NAMES = load_names("middle-names.json")
-AVAILABLE_EQUIPMENT = load_available_equipment("equipment.json")
+import json
+import random
+from typing import Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, render_template, request
+from catalog import Catalog, CatalogManager, Constraints
+from datamodel import Sheet
+import metrics
+from randomize import UNCONSTRAINED, generate_character, generate_characters, generate_level, generate_levels
+from sharedcatalog import SHARED_CATALOG_FILE
+from cache import make_cache
+from pool import SHEET_POOL, SheetPool
+
+# Requests read CATALOGS.current once and use that snapshot throughout, so a reload never mixes
+# two catalog versions within one response
+CATALOGS = CatalogManager.for_sources(SHARED_CATALOG_FILE)
+
+# Sheets generated per step of a streamed API response
+API_CHUNK_SIZE = 256
+API_MAX_COUNT = 100_000
+# Request parameter -> Constraints field
+CONSTRAINT_PARAMETERS = {
+    "class": "cl",
+    "race": "race",
+    "race_source": "race_source",
+    "size": "size",
+    "school": "spell_school",
+    "subclass": "subclass",
+}
 
 app = Flask(__name__)
+# Rendered pages of seeded requests, which are the same every time
+RESPONSE_CACHE = make_cache()
 
 
 class InfoObject:
@@ -29,28 +42,136 @@ class InfoObject:
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
-        level = int(request.form.get("level", 1))
-        alignment = int(request.form.get("alignment", 1))
-        random = request.form.get("random")
-        rating = "UNDEFINED"
-        if random == "on":
-            rating, level = generate_level()
-
-        generated_sheet = generate_character(
-            level,
-            rating,
-            ALAILABLE_FIRST_NAMES,
-            AVAILABLE_MIDDLE_NAMES,
-            AVAILABLE_EQUIPMENT,
-            AVAILABLE_RACES,
-            AVAILABLE_CLASSES,
-            AVAILABLE_SPELLS,
-            AVAILABLE_FEATS,
-            alignment,
-        )
-        return render_template("index.html", sheet=generated_sheet)
+        try:
+            level = int(request.form.get("level", 1))
+            alignment = int(request.form.get("alignment", 1))
+        except ValueError:
+            return "level and alignment must be whole numbers", 400
+        if not 1 <= level <= 20:
+            return "level must be between 1 and 20", 400
+        # Alignment runs from -1 to 1; clamping also keeps the pool to a few buckets per level
+        alignment = min(max(alignment, -1), 1)
+        is_random = request.form.get("random")
+        seed = request.form.get("seed")
+        catalog = CATALOGS.current
+        cache_key = None
+        if seed:
+            cache_key = (seed, level, alignment, is_random == "on", catalog.version)
+            cached = RESPONSE_CACHE.get(cache_key)
+            if cached is not None:
+                return Response(cached, mimetype="text/html")
+        # A seeded request always renders the same sheet
+        rng = random.Random(seed) if seed else None
+        generated_sheet = None
+        if not seed and POOL is not None:
+            # The level field is ignored for random ratings, so they all share one bucket
+            generated_sheet = POOL.pop((1 if is_random == "on" else level, is_random == "on", alignment))
+        if generated_sheet is None:
+            rating = "UNDEFINED"
+            if is_random == "on":
+                rating, level = generate_level(rng)
+
+            generated_sheet = generate_character(level, rating, catalog, alignment, rng)
+        with metrics.timer("dnd5_render_seconds", {"class": generated_sheet.cl.name, "level": generated_sheet.level}):
+            page = render_template("index.html", sheet=generated_sheet)
+        if cache_key is not None:
+            RESPONSE_CACHE.set(cache_key, page.encode("utf8"))
+        return page
     return render_template("index.html", sheet=None)
 
 
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+def generate_sheets(
+    n: int,
+    level: int,
+    is_random: bool,
+    catalog: Catalog,
+    alignment: float,
+    rng: Optional[random.Random] = None,
+    constraints: Constraints = UNCONSTRAINED,
+) -> List[Sheet]:
+    if not is_random:
+        return generate_characters(n, level, "UNDEFINED", catalog, alignment, rng, constraints)
+    # Roll every rating first, then generate each distinct rating as one batch
+    sheets = [None] * n
+    indexes_by_rating = {}
+    for i, rating_and_level in enumerate(generate_levels(n, rng)):
+        indexes_by_rating.setdefault(rating_and_level, []).append(i)
+    for (rating, rating_level), indexes in indexes_by_rating.items():
+        for i, sheet in zip(
+            indexes,
+            generate_characters(len(indexes), rating_level, rating, catalog, alignment, rng, constraints),
+        ):
+            sheets[i] = sheet
+    return sheets
+
+
+def fill_pool(n: int, key: Tuple[int, bool, int]) -> List[Sheet]:
+    level, is_random, alignment = key
+    return generate_sheets(n, level, is_random, CATALOGS.current, alignment)
+
+
+# Warm sheets for unseeded index requests, keyed by (level, random rating, alignment)
+POOL = SheetPool(fill_pool) if SHEET_POOL else None
+if POOL is not None:
+    # Pooled sheets were built from the old catalog
+    CATALOGS.add_listener(lambda catalog: POOL.clear())
+
+
+def iter_sheet_lines(
+    count: int,
+    level: int,
+    is_random: bool,
+    catalog: Catalog,
+    alignment: float,
+    rng: Optional[random.Random] = None,
+    constraints: Constraints = UNCONSTRAINED,
+) -> Iterator[str]:
+    # Generate and serialize chunk by chunk so only one chunk of sheets is alive at a time
+    for start in range(0, count, API_CHUNK_SIZE):
+        for sheet in generate_sheets(
+            min(API_CHUNK_SIZE, count - start), level, is_random, catalog, alignment, rng, constraints
+        ):
+            yield json.dumps(sheet.to_dict()) + "\n"
+
+
+@app.route("/api/characters", methods=["GET", "POST"])
+def api_characters():
+    try:
+        level = int(request.values.get("level", 1))
+        alignment = float(request.values.get("alignment", 0))
+        count = int(request.values.get("count", 1))
+    except ValueError:
+        return {"error": "level, alignment and count must be numbers"}, 400
+    if not 1 <= level <= 20:
+        return {"error": "level must be between 1 and 20"}, 400
+    # Also rules out nan and inf, which would only fail once the stream has started
+    if not -1 <= alignment <= 1:
+        return {"error": "alignment must be between -1 and 1"}, 400
+    if not 1 <= count <= API_MAX_COUNT:
+        return {"error": f"count must be between 1 and {API_MAX_COUNT}"}, 400
+    is_random = request.values.get("random") in ("on", "1", "true")
+    seed = request.values.get("seed")
+    constraints = Constraints(
+        **{field: request.values[name] for name, field in CONSTRAINT_PARAMETERS.items() if request.values.get(name)}
+    )
+    catalog = CATALOGS.current
+    try:
+        # Resolve before streaming starts so an impossible combination is still a 400
+        catalog.candidates(constraints)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    # Each response gets its own stream; a seeded one is reproducible
+    rng = random.Random(seed) if seed else random.Random()
+    return Response(
+        iter_sheet_lines(count, level, is_random, catalog, alignment, rng, constraints),
+        mimetype="application/x-ndjson",
+    )
+
+
 if __name__ == "__main__":
     app.run(debug=True)
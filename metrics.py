@@ -0,0 +1,147 @@
+import bisect
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+METRICS_ENABLED = os.environ.get("DND5_METRICS") == "1"
+
+# Histogram bucket upper bounds in seconds; generation stages run in microseconds, renders in milliseconds
+LATENCY_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+
+LABELS_DATA_TYPE = Tuple[Tuple[str, str], ...]
+
+# Returned by timer() while metrics are disabled so the hot path allocates nothing
+NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LABELS_DATA_TYPE], float] = {}
+        self.histograms: Dict[Tuple[str, LABELS_DATA_TYPE], Histogram] = {}
+        self.help: Dict[str, str] = {}
+
+    def inc(self, name: str, labels: LABELS_DATA_TYPE = (), value: float = 1) -> None:
+        with self.lock:
+            self.counters[name, labels] = self.counters.get((name, labels), 0) + value
+
+    def observe(self, name: str, labels: LABELS_DATA_TYPE, value: float) -> None:
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = Histogram()
+            histogram.observe(value)
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            described = set()
+            for (name, labels), value in counters:
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {self.help.get(name, name)}", f"# TYPE {name} counter"]
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+            for (name, labels), histogram in histograms:
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {self.help.get(name, name)}", f"# TYPE {name} histogram"]
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: LABELS_DATA_TYPE) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+REGISTRY = Registry()
+REGISTRY.describe("dnd5_stage_seconds", "Time spent in each character generation stage")
+REGISTRY.describe("dnd5_render_seconds", "Time spent rendering index.html")
+REGISTRY.describe("dnd5_characters_total", "Characters generated by generate_character")
+
+
+class Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: LABELS_DATA_TYPE):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        REGISTRY.observe(self.name, self.labels, time.perf_counter() - self.start)
+
+
+def label_tuple(labels: Dict[str, object]) -> LABELS_DATA_TYPE:
+    return tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def timer(name: str, labels: Dict[str, object]) -> contextlib.AbstractContextManager:
+    if not METRICS_ENABLED:
+        return NULL_TIMER
+    return Timer(name, label_tuple(labels))
+
+
+def stage_timer(stage: str, cl_name: str, level: int) -> contextlib.AbstractContextManager:
+    if not METRICS_ENABLED:
+        return NULL_TIMER
+    return Timer("dnd5_stage_seconds", (("class", cl_name), ("level", str(level)), ("stage", stage)))
+
+
+def inc(name: str, labels: Dict[str, object], value: float = 1) -> None:
+    if METRICS_ENABLED:
+        REGISTRY.inc(name, label_tuple(labels), value)
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from batch import SheetBatch
+from catalog import Catalog
+from randomize import generate_characters
+
+# Sheets per task; shards have a fixed size so the output does not depend on the worker count
+SHARD_SIZE = 1000
+
+# Catalog shared by every shard in this process, loaded once
+_catalog: Optional[Catalog] = None
+
+
+def load_catalog() -> Catalog:
+    global _catalog
+    if _catalog is None:
+        # The loaders read the compiled bundle when it is fresh
+        _catalog = Catalog.load()
+    return _catalog
+
+
+def generate_shard(n: int, level: int, rating: str, alignment: float, seed: int) -> Tuple[str, Dict[str, Any]]:
+    # Sheets travel back as SheetBatch columns of catalog positions: pickling whole Sheet graphs cost about
+    # as much as generating them, and the parent unpickled every shard on one core
+    catalog = load_catalog()
+    sheets = generate_characters(n, level, rating, catalog, alignment, random.Random(seed))
+    return catalog.version, SheetBatch.from_sheets(sheets, catalog).columns()
+
+
+class ParallelGenerator:
+    def __init__(self, workers: Optional[int] = None, shard_size: int = SHARD_SIZE):
+        self.shard_size = shard_size
+        # Load before forking so workers inherit the catalog instead of loading their own
+        load_catalog()
+        start_methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in start_methods else None)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(), mp_context=context, initializer=load_catalog
+        )
+
+    def iter_shards(
+        self, n: int, level: int, rating: str, alignment: float = 0.0, seed: Optional[int] = None
+    ) -> Iterator[SheetBatch]:
+        # Every shard draws from its own stream, derived in order from the batch seed
+        rng = random.Random(seed)
+        sizes = [min(self.shard_size, n - start) for start in range(0, n, self.shard_size)]
+        seeds = [rng.getrandbits(64) for _ in sizes]
+        results = self.executor.map(
+            generate_shard,
+            sizes,
+            [level] * len(sizes),
+            [rating] * len(sizes),
+            [alignment] * len(sizes),
+            seeds,
+        )
+        return self.rebuild(results)
+
+    @staticmethod
+    def rebuild(results: Iterator[Tuple[str, Dict[str, Any]]]) -> Iterator[SheetBatch]:
+        # Shard rows point into this process's catalog, so sheets share its Race, Spell, Feat and Item objects
+        catalog = load_catalog()
+        for version, columns in results:
+            if version != catalog.version:
+                raise RuntimeError(f"Worker catalog {version} differs from the parent's {catalog.version}")
+            yield SheetBatch.from_columns(catalog, columns)
+
+    def generate(
+        self, n: int, level: int, rating: str, alignment: float = 0.0, seed: Optional[int] = None
+    ) -> SheetBatch:
+        shards = list(self.iter_shards(n, level, rating, alignment, seed))
+        if not shards:
+            return SheetBatch.from_sheets((), load_catalog())
+        return SheetBatch.concatenate(shards)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def __enter__(self) -> "ParallelGenerator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,101 @@
+import collections
+import logging
+import os
+import threading
+from typing import Callable, Deque, Dict, Hashable, List, Optional
+
+import metrics
+from datamodel import Sheet
+
+SHEET_POOL = os.environ.get("DND5_SHEET_POOL") == "1"
+SHEET_POOL_SIZE = int(os.environ.get("DND5_SHEET_POOL_SIZE", 64))
+# Buckets are refilled once they drop below this many sheets
+SHEET_POOL_LOW_WATER = int(os.environ.get("DND5_SHEET_POOL_LOW_WATER", SHEET_POOL_SIZE // 2))
+# Requests for keys beyond this many buckets are never pooled
+SHEET_POOL_MAX_BUCKETS = int(os.environ.get("DND5_SHEET_POOL_MAX_BUCKETS", 64))
+# Sheets generated per refill step, small enough that request threads get the GIL back quickly
+SHEET_POOL_REFILL_BATCH = 16
+
+metrics.REGISTRY.describe("dnd5_pool_requests_total", "Sheet pool pops by result")
+
+logger = logging.getLogger(__name__)
+
+
+class SheetPool:
+    # Pre-generated sheets per bucket key; generate(n, key) produces n sheets for a bucket
+    def __init__(
+        self,
+        generate: Callable[[int, Hashable], List[Sheet]],
+        size: int = SHEET_POOL_SIZE,
+        low_water: int = SHEET_POOL_LOW_WATER,
+        max_buckets: int = SHEET_POOL_MAX_BUCKETS,
+    ):
+        self.generate = generate
+        self.size = size
+        self.low_water = low_water
+        self.max_buckets = max_buckets
+        self.buckets: Dict[Hashable, Deque[Sheet]] = {}
+        # Bumped by clear(); sheets generated under an older generation are stale and never reach a bucket
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.thread = threading.Thread(target=self.refill_loop, name="sheet-pool", daemon=True)
+        self.thread.start()
+
+    def pop(self, key: Hashable) -> Optional[Sheet]:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_buckets:
+                metrics.inc("dnd5_pool_requests_total", {"result": "miss"})
+                return None
+            # First request for this bucket; start filling it for the next ones
+            bucket = self.buckets.setdefault(key, collections.deque())
+        try:
+            sheet = bucket.popleft()
+        except IndexError:
+            sheet = None
+        if len(bucket) < self.low_water:
+            self.wakeup.set()
+        metrics.inc("dnd5_pool_requests_total", {"result": "miss" if sheet is None else "hit"})
+        return sheet
+
+    def clear(self) -> None:
+        with self.lock:
+            self.generation += 1
+            for bucket in list(self.buckets.values()):
+                bucket.clear()
+        self.wakeup.set()
+
+    def refill_loop(self) -> None:
+        while not self.closed:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            refilled = True
+            while refilled and not self.closed:
+                refilled = False
+                for key, bucket in list(self.buckets.items()):
+                    missing = self.size - len(bucket)
+                    if missing <= 0:
+                        continue
+                    generation = self.generation
+                    try:
+                        sheets = self.generate(min(missing, SHEET_POOL_REFILL_BATCH), key)
+                    except Exception:
+                        # Drop the bucket so a key that cannot be generated does not stall the others;
+                        # its requests fall back to generating synchronously
+                        logger.exception("Refilling sheet pool bucket %r failed", key)
+                        self.buckets.pop(key, None)
+                        continue
+                    with self.lock:
+                        if generation != self.generation:
+                            # Cleared while generating, e.g. for a catalog reload; the loop runs again
+                            # because clear() set wakeup
+                            continue
+                        bucket.extend(sheets)
+                    refilled = True
+
+    def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join()
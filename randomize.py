@@ -1,239 +1,376 @@
-from typing import Tuple
-from datamodel import Feat, Item, Race, Sheet, Class, SUBCLASSES, Subclass, Spell
-from scipy.stats import norm
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from catalog import Catalog, Constraints
+from datamodel import Item, Sheet, SUBCLASSES, Subclass, SpellIndex, EquipmentCatalog
+import attr
+import bisect
+import functools
+import itertools
+import json
+import math
+import metrics
+import os
+from metrics import stage_timer
+import numpy as np
 import random
 
+NUMPY_RNG = np.random.default_rng()
+D6 = range(1, 7)
+# Alignments are rounded to this many decimals before looking up subclass weight tables
+ALIGNMENT_PRECISION = 3
+SUBCLASS_WEIGHT_CACHE_SIZE = 1024
+UNCONSTRAINED = Constraints()
 
-def generate_level() -> Tuple[str, int]:
-    probabilities = [
-        57.9887,
-        23.1955,
-        11.5977,
-        2.8994,
-        1.2886,
-        0.8284,
-        0.5272,
-        0.3222,
-        0.2521,
-        0.2000,
-        0.1487,
-        0.1160,
-        0.0983,
-        0.0805,
-        0.0690,
-        0.0580,
-        0.0504,
-        0.0446,
-        0.0387,
-        0.0322,
-        0.0290,
-        0.0264,
-        0.0232,
-        0.0176,
-        0.0141,
-        0.0116,
-        0.0094,
-        0.0077,
-        0.0064,
-        0.0055,
-        0.0048,
-        0.0043,
-        0.0037,
-    ]
-    total = sum(probabilities)
-    normalized_probabilities = [p / total for p in probabilities]
-    ratings = [
-        "0",
-        "1/8",
-        "1/4",
-        "1",
-        "2",
-        "3",
-        "4",
-        "5",
-        "6",
-        "7",
-        "8",
-        "9",
-        "10",
-        "11",
-        "12",
-        "13",
-        "14",
-        "15",
-        "16",
-        "17",
-        "18",
-        "19",
-        "20",
-        "21",
-        "22",
-        "23",
-        "24",
-        "25",
-        "26",
-        "27",
-        "28",
-        "29",
-        "30",
-    ]
-    generated_rating = random.choices(ratings, weights=normalized_probabilities, k=1)[0]
-    level = (
-        list(range(1, 21))[ratings.index(generated_rating)] if ratings.index(generated_rating) <= 20 else 20
-    )
-    return generated_rating, level
+
+@attr.frozen(eq=False)
+class RatingDistribution:
+    # Challenge ratings with their cumulative weights and the character level each maps to
+    ratings: Tuple[str, ...]
+    cum_weights: Tuple[float, ...]
+    levels: Tuple[int, ...]
+    level_by_rating: Dict[str, int] = attr.field(init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        object.__setattr__(self, "level_by_rating", dict(zip(self.ratings, self.levels)))
+
+    @classmethod
+    def from_weights(cls, weights: Dict[str, float]) -> "RatingDistribution":
+        # Ratings keep their default levels; a rating missing from the mapping is never drawn
+        unknown = [rating for rating in weights if rating not in DEFAULT_RATING_LEVELS]
+        if unknown:
+            raise ValueError(f"Unknown challenge ratings {unknown}")
+        total = sum(weights.values())
+        if total <= 0 or any(weight < 0 for weight in weights.values()):
+            raise ValueError("Challenge rating weights must be non-negative and not all zero")
+        ratings = tuple(weights)
+        return cls(
+            ratings,
+            tuple(itertools.accumulate(weight / total for weight in weights.values())),
+            tuple(DEFAULT_RATING_LEVELS[rating] for rating in ratings),
+        )
+
+    @classmethod
+    def load(cls, file: str) -> "RatingDistribution":
+        # A JSON object of rating -> weight
+        with open(file, "r", encoding="utf8") as f:
+            return cls.from_weights(json.load(f))
+
+    def sample(self, rng: Optional[random.Random] = None) -> Tuple[str, int]:
+        rng = rng or random
+        i = bisect.bisect(self.cum_weights, rng.random() * self.cum_weights[-1], 0, len(self.cum_weights) - 1)
+        return self.ratings[i], self.levels[i]
+
+    def sample_many(self, k: int, rng: Optional[random.Random] = None) -> List[Tuple[str, int]]:
+        rng = rng or random
+        level_by_rating = self.level_by_rating
+        ratings = rng.choices(self.ratings, cum_weights=self.cum_weights, k=k)
+        return [(rating, level_by_rating[rating]) for rating in ratings]
+
+
+# Relative frequency of each challenge rating
+DEFAULT_RATING_WEIGHTS = {
+    "0": 57.9887,
+    "1/8": 23.1955,
+    "1/4": 11.5977,
+    "1": 2.8994,
+    "2": 1.2886,
+    "3": 0.8284,
+    "4": 0.5272,
+    "5": 0.3222,
+    "6": 0.2521,
+    "7": 0.2000,
+    "8": 0.1487,
+    "9": 0.1160,
+    "10": 0.0983,
+    "11": 0.0805,
+    "12": 0.0690,
+    "13": 0.0580,
+    "14": 0.0504,
+    "15": 0.0446,
+    "16": 0.0387,
+    "17": 0.0322,
+    "18": 0.0290,
+    "19": 0.0264,
+    "20": 0.0232,
+    "21": 0.0176,
+    "22": 0.0141,
+    "23": 0.0116,
+    "24": 0.0094,
+    "25": 0.0077,
+    "26": 0.0064,
+    "27": 0.0055,
+    "28": 0.0048,
+    "29": 0.0043,
+    "30": 0.0037,
+}
+# The nth rating maps to level n, capped at 20
+DEFAULT_RATING_LEVELS = {rating: min(i + 1, 20) for i, rating in enumerate(DEFAULT_RATING_WEIGHTS)}
+# JSON file of rating -> weight replacing the default weights
+RATING_WEIGHTS_FILE = os.environ.get("DND5_RATING_WEIGHTS")
+RATING_DISTRIBUTION = (
+    RatingDistribution.load(RATING_WEIGHTS_FILE)
+    if RATING_WEIGHTS_FILE
+    else RatingDistribution.from_weights(DEFAULT_RATING_WEIGHTS)
+)
+
+
+def generate_level(
+    rng: Optional[random.Random] = None, distribution: RatingDistribution = RATING_DISTRIBUTION
+) -> Tuple[str, int]:
+    return distribution.sample(rng)
+
+
+def generate_levels(
+    k: int, rng: Optional[random.Random] = None, distribution: RatingDistribution = RATING_DISTRIBUTION
+) -> List[Tuple[str, int]]:
+    return distribution.sample_many(k, rng)
 
 
 def select_spell_by_class(
-    cl_name: str, preferred_school: str, spell_list: Tuple[int, ...], available_spells: Tuple[Spell, ...],
+    cl_name: str,
+    preferred_school: str,
+    spell_list: Tuple[int, ...],
+    spell_index: SpellIndex,
+    rng: Optional[random.Random] = None,
 ):
+    rng = rng or random
     spells = []
-    for spell_level in spell_list:
-        if spell_level > 0:
-            buffer_spells = []
-            while len(buffer_spells) + 1 <= spell_level:
-                names_in_buffer = [spell.name for spell in buffer_spells]
-                if not spells:
-                    selected_spells = [
-                        spell
-                        for spell in available_spells
-                        if cl_name.lower() in spell.classes
-                        and spell.level == "cantrip"
-                        and spell.name not in names_in_buffer
-                    ]
-                else:
-                    selected_spells = [
-                        spell
-                        for spell in available_spells
-                        if cl_name.lower() in spell.classes
-                        and spell.level != "cantrip"
-                        and int(spell.level) == len(spells)
-                        and spell.name not in names_in_buffer
-                    ]
-
-                if preferred_school == "Random":
-                    buffer_spells.append(random.choice(selected_spells))
-                elif random.random() >= 0.5:
-                    selected_spells = [
-                        spell for spell in selected_spells if spell.school == preferred_school.lower()
-                    ]
-                    if not selected_spells:
-                        continue
-                    buffer_spells.append(random.choice(selected_spells))
+    for spell_level, spell_count in enumerate(spell_list):
+        buffer_spells = []
+        if spell_count > 0:
+            if preferred_school == "Random":
+                preferred, other = (), spell_index.get(cl_name, spell_level)
+            else:
+                preferred = spell_index.get(cl_name, spell_level, preferred_school)
+                other = spell_index.get_complement(cl_name, spell_level, preferred_school)
+            # Each slot flips a coin between the two sides while both have spells left and otherwise goes to
+            # whichever side does; the buckets are then sampled in place rather than copied and popped from
+            take_preferred = take_other = 0
+            for _ in range(min(spell_count, len(preferred) + len(other))):
+                if take_preferred < len(preferred) and take_other < len(other):
+                    if rng.random() >= 0.5:
+                        take_preferred += 1
+                    else:
+                        take_other += 1
+                elif take_preferred < len(preferred):
+                    take_preferred += 1
                 else:
-                    selected_spells = [
-                        spell for spell in selected_spells if spell.school != preferred_school.lower()
-                    ]
-                    if not selected_spells:
-                        continue
-                    buffer_spells.append(random.choice(selected_spells))
-            spells.append(buffer_spells.copy())
-        else:
-            spells.append([])
+                    take_other += 1
+            for selected_spells, count in ((preferred, take_preferred), (other, take_other)):
+                if count == 1:
+                    # sample()'s setup costs several times a single randrange
+                    buffer_spells.append(spell_index.spells[selected_spells[rng.randrange(len(selected_spells))]])
+                elif count:
+                    buffer_spells += [spell_index.spells[i] for i in rng.sample(selected_spells, count)]
+        spells.append(buffer_spells)
     return spells
 
 
-def select_subclass_by_normal_distribution_of_alignment(
-    alignment: float, subclasses: Tuple[Subclass, ...], scale: float = 0.5
-) -> Subclass:
-    weights = [norm.pdf(subclass.alignment, loc=alignment, scale=scale) for subclass in subclasses]
-    return random.choices(subclasses, weights, k=1)[0]
+@functools.lru_cache(maxsize=SUBCLASS_WEIGHT_CACHE_SIZE)
+def allowed_subclasses(cl_name: str, subclass_names: Optional[Tuple[str, ...]] = None) -> Tuple[Subclass, ...]:
+    if subclass_names is None:
+        return SUBCLASSES[cl_name]
+    return tuple(subclass for subclass in SUBCLASSES[cl_name] if subclass.name in subclass_names)
 
 
-def generate_character_name(
-    available_first_names: Tuple[str, ...], available_middle_names: Tuple[str, ...]
-) -> str:
-    return random.choice(available_first_names) + " " + random.choice(available_middle_names)
+@functools.lru_cache(maxsize=SUBCLASS_WEIGHT_CACHE_SIZE)
+def subclass_weight_table(
+    cl_name: str, alignment: float, scale: float, subclass_names: Optional[Tuple[str, ...]] = None
+) -> Tuple[float, ...]:
+    # Cumulative normal pdf weights; the pdf constant cancels out, so offset the exponents by the
+    # closest subclass to keep far-off alignments from underflowing to all zero weights
+    exponents = [
+        -0.5 * ((subclass.alignment - alignment) / scale) ** 2
+        for subclass in allowed_subclasses(cl_name, subclass_names)
+    ]
+    top = max(exponents)
+    return tuple(itertools.accumulate(math.exp(exponent - top) for exponent in exponents))
 
 
-def generate_random_base_stats(s: bool, d: bool, c: bool, w: bool, i: bool, ch: bool):
-    def generate_attribute():
-        rolls = [random.randint(1, 6) for _ in range(4)]
-        return sum(sorted(rolls)[1:])
+def select_subclass_by_normal_distribution_of_alignment(
+    alignment: float,
+    cl_name: str,
+    scale: float = 0.5,
+    rng: Optional[random.Random] = None,
+    subclass_names: Optional[Tuple[str, ...]] = None,
+) -> Subclass:
+    rng = rng or random
+    subclasses = allowed_subclasses(cl_name, subclass_names)
+    cum_weights = subclass_weight_table(cl_name, round(alignment, ALIGNMENT_PRECISION), scale, subclass_names)
+    return subclasses[bisect.bisect(cum_weights, rng.random() * cum_weights[-1], 0, len(cum_weights) - 1)]
 
-    def sort_rolls_with_priorities(rolls, priorities):
-        def find_two_largest_numbers_with_indices(lst):
-            if len(lst) < 2:
-                return "List needs to have at least two elements"
 
-            # Find the indices of the two largest numbers
-            largest_index = lst.index(max(lst))
-            second_largest = min(lst)  # Initialize with the smallest value
-            second_largest_index = None
+def generate_character_name(
+    available_first_names: Tuple[str, ...],
+    available_middle_names: Tuple[str, ...],
+    rng: Optional[random.Random] = None,
+) -> str:
+    rng = rng or random
+    return rng.choice(available_first_names) + " " + rng.choice(available_middle_names)
 
-            for i, num in enumerate(lst):
-                if i != largest_index and num > second_largest:
-                    second_largest_index = i
-                    second_largest = num
 
-            return (largest_index, lst[largest_index]), (second_largest_index, lst[second_largest_index])
+def roll_base_stats(
+    n: int, priorities: Union[Sequence[bool], np.ndarray], rng: Optional[random.Random] = None
+) -> np.ndarray:
+    # NumPy draws are seeded from the caller's stream so seeded generation stays reproducible
+    numpy_rng = NUMPY_RNG if rng is None else np.random.default_rng(rng.getrandbits(64))
+    # 4d6 drop lowest for n characters at once, columns ordered str, dex, con, wis, int, cha
+    rolls = numpy_rng.integers(1, 7, size=(n, 6, 4))
+    stats = rolls.sum(axis=2) - rolls.min(axis=2)
 
-        indexes = [i for i, value in enumerate(priorities) if value]
-        buff = [v for i, v in enumerate(rolls) if i in indexes]
-        m1, m2 = find_two_largest_numbers_with_indices(rolls)
+    # Prioritized abilities get the best roll, or the second best if they already hold the best
+    ordered = np.sort(stats, axis=1)
+    best, second_best = ordered[:, -1:], ordered[:, -2:-1]
+    promoted = np.where(stats == best, second_best, best)
+    return np.where(np.asarray(priorities, dtype=bool), promoted, stats)
 
-        # Создание нового списка с учётом приоритетов
-        sorted_rolls = rolls.copy()
-        for i in indexes:
-            if not buff or rolls[i] in buff:
-                sorted_rolls[i] = m1[1] if rolls[i] != m1[1] else m2[1]
-            else:
-                sorted_rolls[i] = buff.pop(0)
-        return sorted_rolls
 
-    rolls = [generate_attribute() for _ in range(6)]
-    priorities = [s, d, c, w, i, ch]
-    sorted_attributes = sort_rolls_with_priorities(rolls, priorities)
-    return sorted_attributes
+def generate_random_base_stats(
+    s: bool, d: bool, c: bool, w: bool, i: bool, ch: bool, rng: Optional[random.Random] = None
+) -> List[int]:
+    # Same rules as roll_base_stats, but for one sheet drawing straight from rng is several times
+    # cheaper than seeding a NumPy generator
+    rng = rng or random
+    rolls = rng.choices(D6, k=24)
+    stats = [sum(rolls[j : j + 4]) - min(rolls[j : j + 4]) for j in range(0, 24, 4)]
+    ordered = sorted(stats)
+    best, second_best = ordered[-1], ordered[-2]
+    return [
+        (second_best if stat == best else best) if priority else stat
+        for stat, priority in zip(stats, (s, d, c, w, i, ch))
+    ]
 
 
 def generate_random_equipment(
     armor_proficiencies: Tuple[str, ...],
     weapon_proficiencies: Tuple[str, ...],
-    available_equipment: Tuple[Item, ...],
-) -> Tuple[Item, ...]:
-    if armor_proficiencies:
-        selected_armor = [item for item in available_equipment if item.type in armor_proficiencies and item.type != "Shield"]
-    else:
-        selected_armor = [[]]
-    selected_weapons = [item for item in available_equipment if item.type in weapon_proficiencies]
-    return (random.choice(selected_armor), random.choice(selected_weapons), Item("Shield", "10 gp", None, None, "Shield") if (random.random() > 0.5 and "Shield" in armor_proficiencies) else None)
+    available_equipment: EquipmentCatalog,
+    rng: Optional[random.Random] = None,
+) -> Tuple[Optional[Item], ...]:
+    rng = rng or random
+    armor = available_equipment.armor_for(armor_proficiencies)
+    weapons = available_equipment.weapons_for(weapon_proficiencies)
+    return (
+        available_equipment[rng.choice(armor)] if armor else None,
+        available_equipment[rng.choice(weapons)],
+        available_equipment.shield if (rng.random() > 0.5 and "Shield" in armor_proficiencies) else None,
+    )
 
 
 def generate_character(
     level: int,
     rating: str,
-    available_first_names: Tuple[str, ...],
-    available_middle_names: Tuple[str, ...],
-    available_equipment: Tuple[Item, ...],
-    available_races: Tuple[Race, ...],
-    available_classes: Tuple[Class, ...],
-    available_spells: Tuple[Spell, ...],
-    available_feats: Tuple[Feat, ...],
+    catalog: Catalog,
     alignment: float = 0.0,
+    rng: Optional[random.Random] = None,
+    constraints: Constraints = UNCONSTRAINED,
 ) -> Sheet:
-    cl = random.choice(available_classes)
-    sub_cl = select_subclass_by_normal_distribution_of_alignment(alignment, SUBCLASSES[cl.name])
-    name = generate_character_name(available_first_names, available_middle_names)
-    stats = generate_random_base_stats(cl.str, cl.dex, cl.con, cl.wis, cl.int, cl.cha)
-    items = generate_random_equipment(cl.armor_proficiencies, cl.weapon_proficiencies, available_equipment)
-    character_sheet = Sheet(
-        level=level,
-        rating=rating,
-        name=name,
-        race=random.choice(available_races),
-        cl=cl,
-        sub_cl=sub_cl,
-        spells=None
-        if not sub_cl.caster
-        else select_spell_by_class(cl.name, sub_cl.spell_school, cl.class_abilities[level], available_spells),
-        items=items,
-        base_str=stats[0],
-        base_dex=stats[1],
-        base_con=stats[2],
-        base_wis=stats[3],
-        base_int=stats[4],
-        base_cha=stats[5],
-        feats=(random.choice(available_feats),),
-    )
+    rng = rng or random
+    # Raises ValueError when nothing in the catalog satisfies the constraints
+    candidates = catalog.candidates(constraints)
+    cl = rng.choice(candidates.classes)
+    with stage_timer("subclass", cl.name, level):
+        sub_cl = select_subclass_by_normal_distribution_of_alignment(
+            alignment, cl.name, rng=rng, subclass_names=candidates.subclass_names.get(cl.name)
+        )
+    with stage_timer("name", cl.name, level):
+        name = generate_character_name(catalog.first_names, catalog.middle_names, rng)
+    with stage_timer("stats", cl.name, level):
+        stats = generate_random_base_stats(cl.str, cl.dex, cl.con, cl.wis, cl.int, cl.cha, rng)
+    with stage_timer("equipment", cl.name, level):
+        items = generate_random_equipment(cl.armor_proficiencies, cl.weapon_proficiencies, catalog.equipment, rng)
+    race = catalog.races[rng.choice(candidates.races)]
+    with stage_timer("spells", cl.name, level):
+        spells = (
+            None
+            if not sub_cl.caster
+            else select_spell_by_class(
+                cl.name, sub_cl.spell_school, cl.class_abilities[level], catalog.spell_index, rng
+            )
+        )
+    with stage_timer("sheet", cl.name, level):
+        character_sheet = Sheet(
+            level=level,
+            rating=rating,
+            name=name,
+            race=race,
+            cl=cl,
+            sub_cl=sub_cl,
+            spells=spells,
+            items=items,
+            base_str=stats[0],
+            base_dex=stats[1],
+            base_con=stats[2],
+            base_wis=stats[3],
+            base_int=stats[4],
+            base_cha=stats[5],
+            feats=(rng.choice(catalog.feats),),
+            hp_seed=rng.getrandbits(32),
+        )
+    metrics.inc("dnd5_characters_total", {"class": cl.name, "level": level})
     return character_sheet
+
+
+def generate_characters(
+    n: int,
+    level: int,
+    rating: str,
+    catalog: Catalog,
+    alignment: float = 0.0,
+    rng: Optional[random.Random] = None,
+    constraints: Constraints = UNCONSTRAINED,
+) -> List[Sheet]:
+    rng = rng or random
+    # Raises ValueError when nothing in the catalog satisfies the constraints
+    candidates = catalog.candidates(constraints)
+    # Draw every per-sheet choice for the whole batch up front
+    classes = rng.choices(candidates.classes, k=n)
+    races = [catalog.races[i] for i in rng.choices(candidates.races, k=n)]
+    first_names = rng.choices(catalog.first_names, k=n)
+    middle_names = rng.choices(catalog.middle_names, k=n)
+    feats = rng.choices(catalog.feats, k=n)
+
+    indexes_by_class = {}
+    for i, cl in enumerate(classes):
+        indexes_by_class.setdefault(cl.name, []).append(i)
+    sub_cls = [None] * n
+    for cl_name, indexes in indexes_by_class.items():
+        subclass_names = candidates.subclass_names.get(cl_name)
+        cum_weights = subclass_weight_table(cl_name, round(alignment, ALIGNMENT_PRECISION), 0.5, subclass_names)
+        picks = rng.choices(allowed_subclasses(cl_name, subclass_names), cum_weights=cum_weights, k=len(indexes))
+        for i, sub_cl in zip(indexes, picks):
+            sub_cls[i] = sub_cl
+
+    priorities = np.array([(cl.str, cl.dex, cl.con, cl.wis, cl.int, cl.cha) for cl in classes], dtype=bool)
+    stats_batch = roll_base_stats(n, priorities, rng).tolist()
+
+    sheets = []
+    for cl, sub_cl, race, first_name, middle_name, feat, stats in zip(
+        classes, sub_cls, races, first_names, middle_names, feats, stats_batch
+    ):
+        sheets.append(
+            Sheet(
+                level=level,
+                rating=rating,
+                name=first_name + " " + middle_name,
+                race=race,
+                cl=cl,
+                sub_cl=sub_cl,
+                spells=None
+                if not sub_cl.caster
+                else select_spell_by_class(
+                    cl.name, sub_cl.spell_school, cl.class_abilities[level], catalog.spell_index, rng
+                ),
+                items=generate_random_equipment(
+                    cl.armor_proficiencies, cl.weapon_proficiencies, catalog.equipment, rng
+                ),
+                base_str=stats[0],
+                base_dex=stats[1],
+                base_con=stats[2],
+                base_wis=stats[3],
+                base_int=stats[4],
+                base_cha=stats[5],
+                feats=(feat,),
+                hp_seed=rng.getrandbits(32),
+            )
+        )
+    return sheets
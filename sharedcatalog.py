@@ -0,0 +1,215 @@
+import collections.abc
+import hashlib
+import inspect
+import json
+import mmap
+import operator
+import os
+import struct
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import attr
+
+import datamodel
+from bundle import SOURCES
+from datamodel import LazyText, TextStore
+
+SHARED_CATALOG_MAGIC = b"DND5SHRD"
+SHARED_CATALOG_VERSION = 1
+SHARED_CATALOG_FILE = os.environ.get("DND5_SHARED_CATALOG")
+NO_STRING = 0xFFFFFFFF
+
+# Column kinds: int32, bool, raw text, JSON, JSON decoded into a tuple, JSON read lazily through LazyText
+COLUMN_FORMATS = {"i": "i", "?": "?", "t": "II", "j": "II", "J": "II", "L": "II"}
+
+
+def table_name(file: str) -> str:
+    return os.path.splitext(os.path.basename(file))[0]
+
+
+def column_kind(values: List[Any]) -> str:
+    if any(isinstance(value, LazyText) for value in values) and all(
+        value is None or isinstance(value, LazyText) for value in values
+    ):
+        return "L"
+    if all(isinstance(value, bool) for value in values):
+        return "?"
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return "i"
+    if all(value is None or isinstance(value, str) for value in values):
+        return "t"
+    if all(isinstance(value, tuple) for value in values):
+        return "J"
+    return "j"
+
+
+class StringPool:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, value: bytes) -> Tuple[int, int]:
+        # Identical strings are stored once
+        offset = self.offsets.get(value)
+        if offset is None:
+            offset = self.offsets[value] = len(self.data)
+            self.data += value
+        return offset, len(value)
+
+
+def encode_value(kind: str, value: Any, pool: StringPool) -> Tuple:
+    if kind in ("i", "?"):
+        return (value,)
+    if value is None:
+        return NO_STRING, 0
+    if kind == "t":
+        return pool.add(value.encode("utf8"))
+    if kind == "L":
+        value = value.value
+    return pool.add(json.dumps(value).encode("utf8"))
+
+
+def write_shared_catalog(path: str, tables: Dict[str, Sequence[Any]]) -> None:
+    pool = StringPool()
+    directory = {}
+    sections = []
+    offset = 0
+    for name, rows in tables.items():
+        rows = list(rows)
+        if rows and attr.has(type(rows[0])):
+            cls_name = type(rows[0]).__name__
+            fields = [field.name for field in attr.fields(type(rows[0]))]
+            columns = [[getattr(row, field) for row in rows] for field in fields]
+        else:
+            cls_name, fields, columns = "str", ["value"], [rows]
+        kinds = [column_kind(column) for column in columns]
+        record = struct.Struct("<" + "".join(COLUMN_FORMATS[kind] for kind in kinds))
+        section = bytearray()
+        for row in zip(*columns):
+            values = []
+            for kind, value in zip(kinds, row):
+                values.extend(encode_value(kind, value, pool))
+            section += record.pack(*values)
+        directory[name] = {
+            "cls": cls_name,
+            "fields": fields,
+            "kinds": kinds,
+            "count": len(rows),
+            "offset": offset,
+        }
+        sections.append(section)
+        offset += len(section)
+
+    header = json.dumps({"tables": directory, "pool": offset}).encode("utf8")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SHARED_CATALOG_MAGIC)
+        f.write(struct.pack("<II", SHARED_CATALOG_VERSION, len(header)))
+        f.write(header)
+        for section in sections:
+            f.write(section)
+        f.write(pool.data)
+    os.replace(tmp_path, path)
+
+
+class SharedTable(collections.abc.Sequence):
+    def __init__(self, path: str, buffer: mmap.mmap, base: int, pool: int, meta: Dict[str, Any]):
+        self._cls = str if meta["cls"] == "str" else getattr(datamodel, meta["cls"])
+        self._fields = meta["fields"]
+        self._kinds = meta["kinds"]
+        self._count = meta["count"]
+        self._buffer = buffer
+        self._base = base + meta["offset"]
+        self._pool = pool
+        self._record = struct.Struct("<" + "".join(COLUMN_FORMATS[kind] for kind in self._kinds))
+        self._text_store = TextStore(path)
+        # Rows drawn by index are kept once decoded: generation keeps drawing the same few hundred races,
+        # spells, feats and items, and decoding one costs several microseconds. Long text stays in the
+        # mapping as LazyText, so a cached row is small. Name tables are plain strings, cheap to decode
+        # and by far the largest, so they are never cached
+        self._rows: Optional[Dict[int, Any]] = None if self._cls is str else {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _decode(self, index: int) -> Any:
+        raw = iter(self._record.unpack_from(self._buffer, self._base + index * self._record.size))
+        values = []
+        for kind in self._kinds:
+            if kind in ("i", "?"):
+                values.append(next(raw))
+                continue
+            offset, length = next(raw), next(raw)
+            if offset == NO_STRING:
+                values.append(None)
+            elif kind == "L":
+                values.append(LazyText(self._text_store, self._pool + offset, length))
+            else:
+                data = self._buffer[self._pool + offset : self._pool + offset + length]
+                if kind == "t":
+                    values.append(data.decode("utf8"))
+                elif kind == "J":
+                    values.append(tuple(json.loads(data)))
+                else:
+                    values.append(json.loads(data))
+        if self._cls is str:
+            return values[0]
+        return self._cls(*values)
+
+    def __iter__(self) -> Iterator[Any]:
+        # Full scans (building indexes, filtering candidates) decode each row without caching it
+        return (self._decode(i) for i in range(self._count))
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return tuple(self._decode(i) for i in range(*index.indices(self._count)))
+        # NumPy integers would carry their width into the record offset arithmetic
+        index = operator.index(index)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("shared table index out of range")
+        if self._rows is None:
+            return self._decode(index)
+        row = self._rows.get(index)
+        if row is None:
+            row = self._rows[index] = self._decode(index)
+        return row
+
+
+def open_shared_catalog(path: str) -> Dict[str, SharedTable]:
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[: len(SHARED_CATALOG_MAGIC)] != SHARED_CATALOG_MAGIC:
+        raise ValueError(f"{path} is not a shared catalog file")
+    version, header_length = struct.unpack_from("<II", buffer, len(SHARED_CATALOG_MAGIC))
+    if version != SHARED_CATALOG_VERSION:
+        raise ValueError(f"{path} has shared catalog version {version}, expected {SHARED_CATALOG_VERSION}")
+    header_start = len(SHARED_CATALOG_MAGIC) + 8
+    header = json.loads(buffer[header_start : header_start + header_length])
+    base = header_start + header_length
+    return {
+        name: SharedTable(path, buffer, base, base + header["pool"], meta)
+        for name, meta in header["tables"].items()
+    }
+
+
+def shared_catalog_version(tables: Dict[str, SharedTable]) -> str:
+    # Hashes the mapped bytes themselves, so the version always matches the rows being served
+    buffer = next(iter(tables.values()))._buffer
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def compile_shared_catalog(path: str) -> None:
+    # Long text is always stored as LazyText columns so reading a row never parses it
+    tables = {}
+    for loader_name, file in SOURCES:
+        loader = getattr(datamodel, loader_name)
+        kwargs = {"lazy": True} if "lazy" in inspect.signature(loader.__wrapped__).parameters else {}
+        tables[table_name(file)] = loader(file, **kwargs)
+    write_shared_catalog(path, tables)
+
+
+if __name__ == "__main__":
+    compile_shared_catalog(sys.argv[1] if len(sys.argv) > 1 else "catalog.shared")
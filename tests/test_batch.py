@@ -0,0 +1,51 @@
+import os
+import random
+
+import pytest
+
+from batch import SheetBatch, generate_batch
+from catalog import Catalog
+from randomize import generate_characters
+from sharedcatalog import compile_shared_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def catalogs(tmp_path_factory):
+    # Source files are named relative to the repository root
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        path = str(tmp_path_factory.mktemp("shared") / "catalog.shared")
+        compile_shared_catalog(path)
+        yield {"json": Catalog.load(), "shared": Catalog.open_shared(path)}
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize("mode", ["json", "shared"])
+def test_row_views_match_generated_sheets(catalogs, mode):
+    catalog = catalogs[mode]
+    sheets = generate_characters(300, 10, "5", catalog, 0.0, random.Random(1))
+    batch = SheetBatch.from_sheets(sheets, catalog)
+    assert len(batch) == len(sheets)
+    assert [sheet.to_dict() for sheet in batch] == [sheet.to_dict() for sheet in sheets]
+    assert batch[-1].to_dict() == sheets[-1].to_dict()
+
+
+def test_shared_and_json_batches_agree(catalogs):
+    shared = generate_batch(200, 12, "8", catalogs["shared"], 0.0, random.Random(2))
+    json_batch = generate_batch(200, 12, "8", catalogs["json"], 0.0, random.Random(2))
+    assert [sheet.to_dict() for sheet in shared] == [sheet.to_dict() for sheet in json_batch]
+    assert (shared.scores == json_batch.scores).all()
+
+
+def test_concatenate_keeps_every_row(catalogs):
+    catalog = catalogs["json"]
+    parts = [
+        generate_characters(40, 3, "1", catalog, 0.0, random.Random(3)),
+        generate_characters(25, 15, "12", catalog, 0.0, random.Random(4)),
+    ]
+    batch = SheetBatch.concatenate([SheetBatch.from_sheets(sheets, catalog) for sheets in parts])
+    assert [sheet.to_dict() for sheet in batch] == [sheet.to_dict() for sheets in parts for sheet in sheets]
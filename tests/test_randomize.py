@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from datamodel import Class, Spell, SpellIndex
+from randomize import select_spell_by_class
+
+SEEDS = range(50)
+
+
+def make_spell(name: str, level: str, school: str, classes=("wizard",)) -> Spell:
+    return Spell(
+        casting_time="1 action",
+        classes=list(classes),
+        components={"material": False, "raw": "V", "somatic": False, "verbal": True},
+        description=f"{name} description",
+        duration="Instantaneous",
+        level=level,
+        higher_levels=None,
+        name=name,
+        range="60 feet",
+        ritual=False,
+        school=school,
+        tags=list(classes),
+        type=f"{level} {school}",
+    )
+
+
+# Wizard: 3 cantrips (2 evocation), 2 first level spells (both abjuration), no higher levels.
+# Warlock: 1 cantrip. Nothing for rogues
+SPELL_INDEX = SpellIndex.from_spells(
+    (
+        make_spell("Fire Bolt", "cantrip", "evocation"),
+        make_spell("Ray of Frost", "cantrip", "evocation"),
+        make_spell("Mage Hand", "cantrip", "conjuration"),
+        make_spell("Shield", "1", "abjuration"),
+        make_spell("Alarm", "1", "abjuration"),
+        make_spell("Eldritch Blast", "cantrip", "evocation", ("warlock",)),
+    )
+)
+
+
+def select(cl_name: str, school: str, spell_list, seed: int):
+    return select_spell_by_class(cl_name, school, tuple(spell_list), SPELL_INDEX, random.Random(seed))
+
+
+def assert_no_repeats(spells):
+    for spell_level in spells:
+        names = [spell.name for spell in spell_level]
+        assert len(names) == len(set(names))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_empty_preferred_side_fills_from_the_other_schools(seed):
+    spells = select("Wizard", "Necromancy", (2, 2), seed)
+    assert [len(spell_level) for spell_level in spells] == [2, 2]
+    assert_no_repeats(spells)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_both_sides_running_out_leaves_slots_unfilled(seed):
+    spells = select("Wizard", "Evocation", (5, 4, 3), seed)
+    assert [len(spell_level) for spell_level in spells] == [3, 2, 0]
+    assert {spell.name for spell in spells[0]} == {"Fire Bolt", "Ray of Frost", "Mage Hand"}
+    assert_no_repeats(spells)
+
+
+@pytest.mark.parametrize("level", range(1, 21))
+def test_warlock_rows_with_zero_slots_stay_empty(level):
+    slots = Class("Warlock", False, False, False, False, False, True).class_abilities[level]
+    spells = select("Warlock", "Evocation", slots, level)
+    assert len(spells) == len(slots)
+    assert [len(spell_level) for spell_level in spells] == [min(slots[0], 1)] + [0] * (len(slots) - 1)
+
+
+def test_all_zero_row_draws_nothing():
+    rng = random.Random(0)
+    state = rng.getstate()
+    spells = select_spell_by_class("Warlock", "Evocation", (0,) * 10, SPELL_INDEX, rng)
+    assert spells == [[]] * 10
+    assert rng.getstate() == state
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_class_without_spells_terminates(seed):
+    spells = select("Rogue", "Illusion", (3, 3, 2), seed)
+    assert spells == [[], [], []]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_random_school_runs_out(seed):
+    spells = select("Wizard", "Random", (4, 3, 1), seed)
+    assert [len(spell_level) for spell_level in spells] == [3, 2, 0]
+    assert_no_repeats(spells)